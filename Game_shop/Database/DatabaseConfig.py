@@ -1,10 +1,39 @@
-DATABASES_CONFIG = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'postgres4',       # Имя вашей БД
-        'USER': "postgres",         # Пользователь БД
-        'PASSWORD': "563674AAi", # Пароль пользователя
-        'HOST': 'localhost',        # Хост (если БД на другом сервере - укажите его IP)
-        'PORT': '5432',             # ПорPostgreSQL (по умолчанию 5432)
-    }
-}
\ No newline at end of file
+PRIMARY = {
+    'ENGINE': 'django.db.backends.postgresql',
+    'NAME': 'postgres4',       # Имя вашей БД
+    'USER': "postgres",         # Пользователь БД
+    'PASSWORD': "563674AAi", # Пароль пользователя
+    'HOST': 'localhost',        # Хост (если БД на другом сервере - укажите его IP)
+    'PORT': '5432',             # ПорPostgreSQL (по умолчанию 5432)
+}
+
+
+def build_databases(primary=None, replica_hosts=(), conn_max_age=60, pgbouncer=False):
+    """
+    DATABASES with the primary as ``default`` and one ``replica<N>`` alias per
+    host in ``replica_hosts`` (same credentials; ``host`` or ``host:port``).
+
+    conn_max_age keeps connections open between requests (None: forever,
+    0: close after each request); health checks drop dead ones before reuse.
+    Behind PgBouncer in transaction mode connections are per-request and
+    server-side cursors must be off.
+    """
+    primary = dict(primary or PRIMARY)
+    primary.update({
+        'CONN_MAX_AGE': 0 if pgbouncer else conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': pgbouncer,
+    })
+    databases = {'default': primary}
+    for number, host in enumerate(replica_hosts, start=1):
+        replica = dict(primary)
+        host, _, port = host.partition(':')
+        replica['HOST'] = host
+        replica['PORT'] = port or primary['PORT']
+        # Tests run against the primary only; replicas read the same test database
+        replica['TEST'] = {'MIRROR': 'default'}
+        databases[f'replica{number}'] = replica
+    return databases
+
+
+DATABASES_CONFIG = build_databases()
@@ -0,0 +1,101 @@
+"""
+Primary/replica routing.
+
+Reads go to a replica only while a request is handled by a view that opted in
+(``replica_reads = True`` on a DRF view class, or the ``replica_reads``
+decorator on a function view) and uses a safe method.  Everything else —
+writes, checkout, payment capture, admin, background commands — reads and
+writes the primary.  After a client's unsafe request its reads stay on the
+primary for REPLICA_STICKY_SECONDS, so it sees its own writes despite
+replication lag.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def replica_reads(view):
+    """Mark a function view as safe to serve from a read replica."""
+    view.replica_reads = True
+    return view
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get():
+            replicas = replica_aliases()
+            if replicas:
+                return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so rows from any alias may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def _client_key(request):
+    # DRF authenticates inside the view, so identify the client by its bearer
+    # token (or address) rather than request.user
+    identity = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+    return 'db:sticky:' + hashlib.sha1(identity.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    # Works in both modes so the async catalog views are not forced back onto a thread under ASGI
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _read_from_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        if request.method not in SAFE_METHODS and replica_aliases():
+            cache.set(_client_key(request), True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        token = _read_from_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        if request.method not in SAFE_METHODS and replica_aliases():
+            await cache.aset(_client_key(request), True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS or not replica_aliases():
+            return None
+        # DRF class views expose the class as view_func.cls; decorated function views carry the flag themselves
+        opted_in = getattr(view_func, 'replica_reads', False) or getattr(getattr(view_func, 'cls', None), 'replica_reads', False)
+        if opted_in and not cache.get(_client_key(request)):
+            _read_from_replica.set(True)
+        return None
@@ -1,6 +1,7 @@
 from pathlib import Path
-from Database.DatabaseConfig import DATABASES_CONFIG
+from Database.DatabaseConfig import build_databases
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 from environs import Env
 import os
 
@@ -13,8 +14,23 @@ env.read_env()
 # Then define PAYPAL_CONFIG
 REACT_APP_PAYPAL_CLIENT_ID = env('PAYPAL_CLIENT_ID')
 REACT_APP_PAYPAL_SECRET_ID = env('PAYPAL_SECRET_ID')
-
-DATABASES = DATABASES_CONFIG
+# Override to point utils.paypal.PayPalClient at a local stub server
+PAYPAL_API_URL = env('PAYPAL_API_URL', 'https://api-m.sandbox.paypal.com')
+PAYPAL_TIMEOUT = env.float('PAYPAL_TIMEOUT', 10)
+PAYPAL_POOL_SIZE = env.int('PAYPAL_POOL_SIZE', 10)
+# Id of the webhook registered in the PayPal dashboard for /api/payments/paypal/webhook/
+PAYPAL_WEBHOOK_ID = env('PAYPAL_WEBHOOK_ID', '')
+
+# Persistent connections and optional read replicas (Database/DatabaseConfig.py);
+# DATABASE_REPLICA_HOSTS is a comma-separated list of host[:port]
+DATABASES = build_databases(
+    replica_hosts=env.list('DATABASE_REPLICA_HOSTS', []),
+    conn_max_age=env.int('DB_CONN_MAX_AGE', 60),
+    pgbouncer=env.bool('DB_PGBOUNCER', False),
+)
+DATABASE_ROUTERS = ['Database.routers.PrimaryReplicaRouter']
+# Reads stay on the primary this long after a client's write (read-your-writes)
+REPLICA_STICKY_SECONDS = 10
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,7 +60,9 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_filters',
+    'channels',
     "corsheaders",
     'rest_framework',
     'rest_framework_simplejwt.token_blacklist',
@@ -66,15 +84,19 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
 ]
+# Checkout sends Idempotency-Key (store/idempotency.py)
+CORS_ALLOW_HEADERS = [*default_headers, 'idempotency-key']
 
 # Make sure CORS middleware is properly positioned
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Должен быть первым
     'django.middleware.security.SecurityMiddleware',
+    'utils.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'Database.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -105,6 +127,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Game_shop.wsgi.application'
+ASGI_APPLICATION = 'Game_shop.asgi.application'
 
 
 
@@ -151,23 +174,107 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Static files are served by WhiteNoise from STATIC_ROOT: collectstatic writes
+# hashed names plus .gz/.br variants, and hashed files get far-future headers
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'utils.storage.StaticFilesStorage'},
+}
+
+# Media goes through utils.media.serve_media.  Set one of these to hand the
+# bytes to the front-end server instead of streaming them from a worker:
+#   nginx:  MEDIA_ACCEL_REDIRECT_PREFIX=/protected-media/ with
+#           location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+#   Apache/lighttpd: MEDIA_SENDFILE_HEADER=X-Sendfile
+SERVE_MEDIA = env.bool('SERVE_MEDIA', True)
+MEDIA_ACCEL_REDIRECT_PREFIX = env('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+MEDIA_SENDFILE_HEADER = env('MEDIA_SENDFILE_HEADER', '')
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 7
+
+# Resized copies of product, category and gallery images (store/images.py)
+IMAGE_DERIVATIVE_WIDTHS = (64, 160, 320, 640, 1280)
+IMAGE_DERIVATIVE_FORMATS = ('avif', 'webp')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache: local memory unless REDIS_URL is set (production)
+REDIS_URL = env('REDIS_URL', None)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Channel layer for the support chat sockets (userauths/consumers.py)
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+
+# Public catalog responses are invalidated by a version counter (store/cache.py);
+# the timeout only bounds how long superseded entries linger.
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Stored responses for POSTs sent with an Idempotency-Key header (store/idempotency.py)
+# Must be shared by all workers (Redis); a per-process locmem cache lets a
+# retry on another worker create the order again (`check --deploy` warns)
+IDEMPOTENCY_CACHE_ALIAS = 'default'
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+# Authenticated User+Profile kept between requests (userauths/authentication.py);
+# saves invalidate it, the timeout bounds staleness from queryset.update()
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Expired outstanding/blacklisted refresh tokens are deleted by
+# `manage.py prune_token_blacklist`, run from cron or as a worker with --loop
+# (userauths/tokens.py).  Looping workers prune once per interval between them,
+# coordinated through a cache that must be shared (`check --deploy` warns).
+TOKEN_BLACKLIST_PRUNE_INTERVAL = env.int('TOKEN_BLACKLIST_PRUNE_INTERVAL', 60 * 60)
+TOKEN_BLACKLIST_PRUNE_BATCH_SIZE = 5000
+TOKEN_BLACKLIST_PRUNE_CACHE_ALIAS = 'default'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'userauths.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # orjson-based JSON; the browsable API only in development
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
+        'utils.renderers.ORJSONRenderer',
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'utils.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Keyset pagination; ?page=N keeps the page-number format (utils/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'utils.pagination.KeysetPagination',
     'PAGE_SIZE': 10
 }
 
@@ -1,8 +1,9 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
-from store.views import create_order, paypal_success, paypal_cancel, complete_order
+from django.urls import path, re_path, include
+from store.views import paypal_success, paypal_cancel, paypal_webhook, complete_order
+from store.images import serve_derivative
+from utils.media import serve_media
 
 
 urlpatterns = [
@@ -11,16 +12,21 @@ urlpatterns = [
     path('api/', include("userauths.urls")),
     path('api/', include("vendor.urls")),
     path('api/', include("customer.urls")),
-    path('api/orders/', create_order, name='create-order'),
     path('api/orders/<int:order_id>/complete/', complete_order, name='complete-order'),
     path('api/payments/paypal/success/', paypal_success, name='paypal-success'),
     path('api/payments/paypal/cancel/', paypal_cancel, name='paypal-cancel'),
+    path('api/payments/paypal/webhook/', paypal_webhook, name='paypal-webhook'),
     path("ckeditor5/",include("django_ckeditor_5.urls")),
+    # Renders a missing image derivative on first request, then serves it like other media
+    path(f"{settings.MEDIA_URL.strip('/')}/derivatives/<path:path>", serve_derivative, name='image-derivative'),
     
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+# Static files are served by WhiteNoiseMiddleware
+if settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(rf"^{settings.MEDIA_URL.strip('/')}/(?P<path>.+)$", serve_media, name='media'),
+    ]
 
 
 # Add these to your urlpatterns
\ No newline at end of file
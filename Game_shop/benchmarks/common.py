@@ -0,0 +1,68 @@
+"""
+Shared setup for the scripts in this directory.
+
+Every script runs against a throwaway test database, created and dropped the
+way ``manage.py test`` does it, so it never reads or writes real data.  Run
+them from the project directory, e.g.::
+
+    python -m benchmarks.create_order
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Game_shop.settings')
+    django.setup()
+    import logging
+    # Request and signal logging would dominate the timings
+    logging.disable(logging.WARNING)
+
+
+@contextmanager
+def test_database():
+    from django.core.cache import cache
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+    # DEBUG off, as in production: no per-query logging inside the timings
+    setup_test_environment(debug=False)
+    config = setup_databases(verbosity=0, interactive=False)
+    cache.clear()
+    try:
+        yield
+    finally:
+        teardown_databases(config, verbosity=0)
+        teardown_test_environment()
+
+
+def timed(func, repeat=50):
+    """Mean wall time of ``func()`` in milliseconds, after one warm-up call"""
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def make_products(count, category=None, vendor=None):
+    """Published products with one variant, one variant item and one gallery image each"""
+    from decimal import Decimal
+
+    from store.models import Gallery, Product, Variant, VariantItem
+
+    products = []
+    start = Product.objects.count()
+    for number in range(start + 1, start + count + 1):
+        product = Product.objects.create(
+            name=f'Game {number}', description='<p>game</p>', category=category, vendor=vendor,
+            price=Decimal('19.99'), regular_price=Decimal('29.99'), shipping=Decimal('1.50'), sku=f'BENCH{number}'
+        )
+        variant = Variant.objects.create(product=product, name='Edition')
+        VariantItem.objects.create(variant=variant, title='Standard', content='Base game')
+        products.append(product)
+    # bulk_create skips the post_save hook that renders image derivatives into MEDIA_ROOT
+    Gallery.objects.bulk_create([Gallery(product=product, image='images/game.jpg') for product in products])
+    return products
@@ -0,0 +1,84 @@
+"""
+Round trips and wall time of checkout order creation for a 50-item cart.
+
+``per-row`` replays the loop the old create_order view ran before the bulk
+rewrite (Product.objects.get, OrderItem.objects.create and order.vendor.add
+per row, autocommit, unprefetched serialization); ``bulk`` POSTs the cart to
+/api/orders/ (OrderViewSet.create, OrderSerializer.create).
+
+    python -m benchmarks.create_order [--items 50] [--vendors 5]
+"""
+import argparse
+
+from .common import make_products, setup, test_database, timed
+
+
+def per_row_create_order(user, line_items):
+    from store.models import Order, OrderItem, Product
+    from store.serializers import OrderSerializer
+
+    validated_items = []
+    subtotal = shipping_cost = 0
+    for product_id, quantity in line_items:
+        product = Product.objects.get(id=product_id)
+        item_subtotal = float(product.price) * quantity
+        item_shipping = float(product.shipping or 0) * quantity
+        subtotal += item_subtotal
+        shipping_cost += item_shipping
+        validated_items.append((product, quantity, float(product.price), item_subtotal, item_shipping))
+    tax = round(subtotal * 0.10, 2)
+    service_fee = round(subtotal * 0.05, 2)
+    order = Order.objects.create(
+        customer=user, payment_method='PayPal', payment_status='Processing', order_status='Pending',
+        sub_total=subtotal, shipping=shipping_cost, tax=tax, service_fee=service_fee,
+        total=subtotal + shipping_cost + tax + service_fee
+    )
+    for product, quantity, price, item_subtotal, item_shipping in validated_items:
+        OrderItem.objects.create(order=order, product=product, qty=quantity, price=price, sub_total=item_subtotal, shipping=item_shipping)
+    for vendor in {product.vendor for product, *_ in validated_items if product.vendor}:
+        order.vendor.add(vendor)
+    return OrderSerializer(order).data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=50)
+    parser.add_argument('--vendors', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    from userauths.models import User
+
+    with test_database():
+        vendors = [User.objects.create_user(email=f'vendor{i}@example.com', username=f'vendor{i}', password='x') for i in range(args.vendors)]
+        customer = User.objects.create_user(email='buyer@example.com', username='buyer', password='x')
+        products = []
+        for number in range(args.items):
+            products += make_products(1, vendor=vendors[number % args.vendors])
+        line_items = [(product.id, 2) for product in products]
+        client = APIClient()
+        client.force_authenticate(customer)
+        cart = {'payment_method': 'PayPal', 'order_items': [{'product': pk, 'qty': qty} for pk, qty in line_items]}
+
+        def bulk():
+            response = client.post('/api/orders/', cart, format='json')
+            assert response.status_code == 201, response.data
+
+        def per_row():
+            per_row_create_order(customer, line_items)
+
+        print(f'POST /api/orders/, {args.items} items from {args.vendors} vendors')
+        for label, func in (('per-row', per_row), ('bulk', bulk)):
+            with CaptureQueriesContext(connection) as queries:
+                func()
+            count = len(queries)
+            print(f'  {label:8s} {count:4d} queries  {timed(func, args.repeat):8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
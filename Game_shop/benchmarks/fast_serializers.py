@@ -0,0 +1,90 @@
+"""
+ModelSerializers against store/fast_serializers.py on 1,000 rows.
+
+Each pair serializes the same rows with the same request (absolute media
+URLs), from the database to rendered JSON, and must produce the same bytes.
+
+    python -m benchmarks.fast_serializers [--rows 1000]
+"""
+import argparse
+
+from .common import make_products, setup, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=3, help='Order items per order')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    setup()
+    from decimal import Decimal
+
+    from django.db import connection
+    from django.db.models import Prefetch
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIRequestFactory
+
+    from store.fast_serializers import MediaURLs, serialize_cart, serialize_orders, serialize_products
+    from store.models import Cart, Category, Order, OrderItem, Product
+    from store.prefetch import catalog_profile
+    from store.serializers import CartSerializer, OrderListSerializer, ProductSerializer
+    from userauths.models import User
+
+    with test_database():
+        category = Category.objects.create(title='RPG')
+        vendor = User.objects.create_user(email='vendor@example.com', username='vendor', password='x')
+        customer = User.objects.create_user(email='buyer@example.com', username='buyer', password='x')
+        products = make_products(args.rows, category, vendor)
+        Cart.objects.bulk_create([
+            Cart(product=product, user=customer, qty=1, price=product.price, total=product.price, cart_id='bench')
+            for product in products
+        ])
+        orders = Order.objects.bulk_create([Order(customer=customer, total=Decimal('59.97')) for _ in range(args.rows)])
+        Order.vendor.through.objects.bulk_create([Order.vendor.through(order_id=order.id, user_id=vendor.id) for order in orders])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[(number + offset) % len(products)], qty=1, price=Decimal('19.99'))
+            for number, order in enumerate(orders) for offset in range(args.items)
+        ])
+
+        request = APIRequestFactory().get('/api/products/')
+        context = {'request': request}
+        renderer = JSONRenderer()
+        product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+        cart_ids = list(Cart.objects.order_by('id').values_list('id', flat=True))
+        order_ids = list(Order.objects.order_by('id').values_list('id', flat=True))
+        order_items = Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('product', 'game_key'))
+
+        cases = [
+            (
+                f'{args.rows} products',
+                lambda: ProductSerializer(catalog_profile(Product.objects.order_by('id')), many=True, context=context).data,
+                lambda: serialize_products(product_ids, MediaURLs(request)),
+            ),
+            (
+                f'{args.rows} cart rows',
+                lambda: CartSerializer(catalog_profile(Cart.objects.order_by('id'), prefix='product__'), many=True, context=context).data,
+                lambda: serialize_cart(cart_ids, MediaURLs(request)),
+            ),
+            (
+                f'{args.rows} orders x {args.items} items',
+                lambda: OrderListSerializer(Order.objects.order_by('id').prefetch_related('vendor', order_items), many=True, context=context).data,
+                lambda: serialize_orders(order_ids, MediaURLs(request)),
+            ),
+        ]
+
+        for label, model_serializer, fast_serializer in cases:
+            if renderer.render(model_serializer()) != renderer.render(fast_serializer()):
+                raise SystemExit(f'{label}: the serializers disagree')
+            print(label)
+            for name, serialize in (('model', model_serializer), ('fast', fast_serializer)):
+                with CaptureQueriesContext(connection) as queries:
+                    serialize()
+                count = len(queries)
+                print(f'  {name:6s} {count:2d} queries  {timed(lambda: renderer.render(serialize()), args.repeat):8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Requests per second on GET /api/products/ by authentication mode.
+
+Each request goes through the full middleware stack with Django's test
+client. The product list is served from the catalog cache after the first
+request, so the differences between the modes come from authentication:
+
+* ``anonymous`` - no Authorization header
+* ``stateless`` - StatelessJWTAuthentication: a ClaimsUser built from the token, no query
+* ``cached`` - CachedJWTAuthentication: User+Profile from the cache
+* ``stock`` - rest_framework_simplejwt's JWTAuthentication: one User query per request
+
+    python -m benchmarks.jwt_auth [--products 20] [--requests 2000]
+"""
+import argparse
+import time
+from unittest import mock
+
+from .common import make_products, setup, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    from store.views import ProductViewSet
+    from userauths.authentication import CachedJWTAuthentication, StatelessJWTAuthentication
+    from userauths.models import User
+    from userauths.serializers import MyTokenObtainPairSerializer
+
+    with test_database():
+        make_products(args.products)
+        user = User.objects.create_user(email='buyer@example.com', username='buyer', password='x')
+        access = str(MyTokenObtainPairSerializer.get_token(user).access_token)
+        client = Client()
+        modes = [
+            ('anonymous', StatelessJWTAuthentication, {}),
+            ('stateless', StatelessJWTAuthentication, {'HTTP_AUTHORIZATION': f'Bearer {access}'}),
+            ('cached', CachedJWTAuthentication, {'HTTP_AUTHORIZATION': f'Bearer {access}'}),
+            ('stock', JWTAuthentication, {'HTTP_AUTHORIZATION': f'Bearer {access}'}),
+        ]
+
+        print(f'GET /api/products/, {args.products} products, {args.requests} requests per mode')
+        for label, authentication, headers in modes:
+            with mock.patch.object(ProductViewSet, 'authentication_classes', [authentication]):
+                def get():
+                    response = client.get('/api/products/', **headers)
+                    assert response.status_code == 200, response.status_code
+
+                # Warms the catalog and auth caches; the next request shows the steady state
+                get()
+                with CaptureQueriesContext(connection) as queries:
+                    get()
+                count = len(queries)
+                start = time.perf_counter()
+                for _ in range(args.requests):
+                    get()
+                elapsed = time.perf_counter() - start
+            print(f'  {label:10s} {count:2d} queries/request  {args.requests / elapsed:8.0f} req/s')
+
+
+if __name__ == '__main__':
+    main()
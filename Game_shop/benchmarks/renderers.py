@@ -0,0 +1,68 @@
+"""
+Render and parse time of real API payloads: stock JSON against orjson.
+
+Payloads are ProductSerializer output for a product page and OrderSerializer
+output for a page of orders, built over the catalog prefetch profile.  Both
+renderers must produce the same bytes; the script stops if they do not.
+
+    python -m benchmarks.renderers [--products 50] [--orders 20] [--items 5]
+"""
+import argparse
+import io
+
+from .common import make_products, setup, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=50)
+    parser.add_argument('--orders', type=int, default=20)
+    parser.add_argument('--items', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup()
+    from decimal import Decimal
+
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from store.models import Category, Order, OrderItem, Product
+    from store.prefetch import catalog_profile, order_items_prefetch
+    from store.serializers import OrderSerializer, ProductSerializer
+    from userauths.models import User
+    from utils.parsers import ORJSONParser
+    from utils.renderers import ORJSONRenderer
+
+    with test_database():
+        category = Category.objects.create(title='RPG')
+        products = make_products(max(args.products, args.items), category)
+        customer = User.objects.create_user(email='buyer@example.com', username='buyer', password='x')
+        for _ in range(args.orders):
+            order = Order.objects.create(customer=customer, total=Decimal('99.95'), payment_status='Paid')
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, qty=1, price=product.price, sub_total=product.price)
+                for product in products[:args.items]
+            ])
+
+        payloads = [
+            (f'{args.products} products', ProductSerializer(catalog_profile(Product.objects.all()[:args.products]), many=True).data),
+            (f'{args.orders} orders x {args.items} items', OrderSerializer(
+                Order.objects.prefetch_related('vendor', 'coupons', order_items_prefetch()), many=True
+            ).data),
+        ]
+
+        for label, data in payloads:
+            stock = JSONRenderer().render(data)
+            fast = ORJSONRenderer().render(data)
+            if stock != fast:
+                raise SystemExit(f'{label}: the renderers disagree')
+            print(f'{label} ({len(stock) / 1024:.0f} KB)')
+            for name, renderer, json_parser in (('json', JSONRenderer(), JSONParser()), ('orjson', ORJSONRenderer(), ORJSONParser())):
+                render = timed(lambda: renderer.render(data), args.repeat)
+                parse = timed(lambda: json_parser.parse(io.BytesIO(stock)), args.repeat)
+                print(f'  {name:7s} render {render:6.2f} ms  parse {parse:6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
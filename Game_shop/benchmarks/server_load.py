@@ -0,0 +1,179 @@
+"""
+Load test of running servers: WSGI (Gunicorn) against ASGI (Daphne/Uvicorn).
+
+Unlike the other scripts this one does not set up Django; it drives servers
+started in another shell, each on every route set::
+
+    gunicorn Game_shop.wsgi -w 4 -b 127.0.0.1:8001
+    daphne -b 127.0.0.1 -p 8002 Game_shop.asgi:application
+    python -m benchmarks.server_load wsgi=http://127.0.0.1:8001 asgi=http://127.0.0.1:8002
+
+Scenarios:
+
+* ``catalog`` - product list, product detail and categories in turn
+  (``/api/...`` DRF views, ``/api/async/...`` async views)
+* ``paypal`` - webhook deliveries whose signature check waits on PayPal.
+  ``--paypal-delay`` starts a stub PayPal on ``--paypal-port``; start the
+  servers with ``PAYPAL_API_URL=http://127.0.0.1:<port>`` so they call it.
+  Every request stores a PayPalWebhookEvent, so use a scratch database.
+
+    python -m benchmarks.server_load wsgi=... asgi=... [--concurrency 100] [--duration 10] [--paypal-delay 0.2]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import statistics
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+ROUTES = {
+    'sync': {
+        'products': '/api/products/',
+        'product': '/api/products/{pk}/',
+        'categories': '/api/categories/',
+        'webhook': '/api/payments/paypal/webhook/',
+    },
+    'async': {
+        'products': '/api/async/products/',
+        'product': '/api/async/products/{pk}/',
+        'categories': '/api/async/categories/',
+        'webhook': '/api/async/payments/paypal/webhook/',
+    },
+}
+
+# Transmission headers the signature check forwards to PayPal
+WEBHOOK_HEADERS = {
+    'Paypal-Auth-Algo': 'SHA256withRSA',
+    'Paypal-Cert-Url': 'https://api.paypal.com/cert',
+    'Paypal-Transmission-Id': 'benchmark',
+    'Paypal-Transmission-Sig': 'benchmark',
+    'Paypal-Transmission-Time': '2024-01-01T00:00:00Z',
+}
+
+
+def run_paypal_stub(port, delay):
+    """PayPal OAuth and webhook verification endpoints answering after ``delay`` seconds"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if self.path == '/v1/oauth2/token':
+                body = {'access_token': 'benchmark', 'expires_in': 3600}
+            else:
+                time.sleep(delay)
+                body = {'verification_status': 'SUCCESS'}
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def catalog_requests(client, routes, product_id):
+    paths = [routes['products'], routes['product'].format(pk=product_id), routes['categories']]
+    number = 0
+    while True:
+        yield client.get(paths[number % len(paths)])
+        number += 1
+
+
+def webhook_requests(client, routes):
+    while True:
+        event = {'id': f'WH-LOAD-{uuid.uuid4()}', 'event_type': 'BENCHMARK.LOAD', 'resource': {}}
+        yield client.post(routes['webhook'], json=event, headers=WEBHOOK_HEADERS)
+
+
+async def load(make_requests, concurrency, duration):
+    """Keep ``concurrency`` requests in flight for ``duration`` seconds"""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        requests = make_requests()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await next(requests)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def report(label, latencies, errors, elapsed):
+    if not latencies:
+        print(f'  {label:28s} no successful requests, {errors} errors')
+        return
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f'  {label:28s} {len(latencies) / elapsed:8.0f} req/s'
+        f'  p50 {statistics.median(latencies) * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms  {errors} errors'
+    )
+
+
+async def run(targets, args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    for name, base_url in targets:
+        print(f'{name} ({base_url}), {args.concurrency} concurrent clients, {args.duration:g} s per run')
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+            products = (await client.get(ROUTES['sync']['products'])).json()['results']
+            if not products:
+                raise SystemExit(f'{base_url} has no published products to load')
+            for route_set, routes in ROUTES.items():
+                result = await load(lambda: catalog_requests(client, routes, products[0]['id']), args.concurrency, args.duration)
+                report(f'catalog, {route_set} views', *result)
+                if args.paypal_delay is not None:
+                    result = await load(lambda: webhook_requests(client, routes), args.concurrency, args.duration)
+                    report(f'paypal webhook, {route_set} views', *result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('targets', nargs='+', metavar='NAME=URL', help='Servers to load, e.g. wsgi=http://127.0.0.1:8001')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--paypal-delay', type=float, default=None, help='Seconds the stub PayPal takes to verify a webhook')
+    parser.add_argument('--paypal-port', type=int, default=9100)
+    args = parser.parse_args()
+
+    targets = []
+    for target in args.targets:
+        name, _, url = target.partition('=')
+        if not url:
+            parser.error(f'expected NAME=URL, got {target!r}')
+        targets.append((name, url.rstrip('/')))
+
+    stub = None
+    if args.paypal_delay is not None:
+        stub = multiprocessing.Process(target=run_paypal_stub, args=(args.paypal_port, args.paypal_delay), daemon=True)
+        stub.start()
+    try:
+        asyncio.run(run(targets, args))
+    finally:
+        if stub is not None:
+            stub.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,12 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from .models import Wishlist, Address, Notifications
 from userauths.serializers import PayPalOrderSerializer
 from store.models import Order
+from store.prefetch import order_items_prefetch
+from userauths import counters
 from .serializers import WishlistSerializer, AddressSerializer, NotificationsSerializer
 import logging
 
@@ -20,10 +24,10 @@ class WishlistViewSet(viewsets.ModelViewSet):
         if user.is_staff:
             # Администраторы видят все записи
             logger.info(f"Admin user {user.username} accessing all wishlist items")
-            return Wishlist.objects.all()
+            return Wishlist.objects.select_related('user', 'product')
         
         # Фильтруем записи по текущему пользователю
-        user_wishlist = Wishlist.objects.filter(user=user)
+        user_wishlist = Wishlist.objects.filter(user=user).select_related('user', 'product')
         logger.info(f"User {user.username} (ID: {user.id}): Found {user_wishlist.count()} wishlist items")
         
         return user_wishlist
@@ -54,9 +58,10 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = Order.objects.prefetch_related(order_items_prefetch())
         if user.is_staff:
-            return Order.objects.all()
-        return Order.objects.filter(customer=user)
+            return queryset
+        return queryset.filter(customer=user)
 
 class NotificationsViewSet(viewsets.ModelViewSet):
     serializer_class = NotificationsSerializer
@@ -74,6 +79,10 @@ class NotificationsViewSet(viewsets.ModelViewSet):
         
         # Фильтруем записи по текущему пользователю
         user_notifications = Notifications.objects.filter(user=user)
-        logger.info(f"User {user.username} (ID: {user.id}): Found {user_notifications.count()} notifications")
+        logger.info(f"User {user.username} (ID: {user.id}) accessing notifications")
         
         return user_notifications
+
+    @action(detail=False, methods=['GET'])
+    def unread_count(self, request):
+        return Response({'unread_count': counters.get_count(request.user.id, counters.NOTIFICATIONS)})
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from store import models as store_models
 from .models import GameKey
+from .search import search_products
 
 class GalleryInline(admin.TabularInline):
     model = store_models.Gallery
@@ -17,9 +18,13 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('title',)}
     search_fields = ['title']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_games_count()
+
     def get_products_count(self, obj):
-        return obj.product_set.count()
+        return obj.games_count
     get_products_count.short_description = 'Games Count'
+    get_products_count.admin_order_field = 'published_games_count'
 
 @admin.register(store_models.Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -44,6 +49,12 @@ class ProductAdmin(admin.ModelAdmin):
         })
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the indexed full-text search instead of ILIKE over description HTML
+        if not search_term:
+            return queryset, False
+        return search_products(queryset, search_term), False
+
     def save_model(self, request, obj, form, change):
         if not obj.vendor:
             obj.vendor = request.user
@@ -101,6 +112,21 @@ class GameKeyAdmin(admin.ModelAdmin):
             return self.readonly_fields + ['key', 'status', 'product', 'order']
         return self.readonly_fields
 
+@admin.register(store_models.OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['recipient', 'subject', 'order_item__item_id']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
+    raw_id_fields = ['order_item']
+
+@admin.register(store_models.PayPalWebhookEvent)
+class PayPalWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'event_type', 'resource_id', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['event_type', 'status']
+    search_fields = ['event_id', 'resource_id']
+    readonly_fields = ['received_at', 'processed_at', 'last_error']
+
 admin.site.register(store_models.Variant, VariantAdmin)
 admin.site.register(store_models.VariantItem, VariantItemAdmin)
 admin.site.register(store_models.Gallery, GalleryAdmin)
@@ -0,0 +1,111 @@
+"""
+Async variants of the hot catalog reads and of the PayPal webhook, for ASGI
+deployments (Daphne/Uvicorn).  They are mounted under /api/async/ and return
+the same payloads as their DRF counterparts (the product and category lists
+page with the same keyset cursor envelopes), but a request waiting on the
+cache or on PayPal does not hold a worker thread.
+
+Django 4.2 still runs each ORM query in a thread (sync_to_async), so the
+gain is largest on catalog cache hits and on the PayPal round trip.
+"""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+from rest_framework.request import Request
+
+from Database.routers import replica_reads
+from utils.paypal import AsyncPayPalClient, PayPalError
+from .cache import acached_catalog_response
+from .models import Product
+from .prefetch import catalog_profile
+from .serializers import ProductSerializer
+from .views import CategoryViewSet, ProductViewSet, discounted_products_queryset
+from .webhooks import record_event
+
+logger = logging.getLogger(__name__)
+
+# Django 4.2's require_http_methods and csrf_exempt wrap views in sync
+# functions, which would hide the coroutine from the handler, so the method
+# check is done inline and csrf_exempt is set as an attribute.
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def _list_page(viewset, request):
+    # Exactly the page the DRF list route serves: its filters, keyset cursor
+    # envelope and serializer, with the ORM work in the calling thread
+    drf_request = Request(request)
+    view = viewset(request=drf_request, args=(), kwargs={}, format_kwarg=None, action='list')
+    response = view._list(drf_request)
+    if response.status_code != 200:
+        # CategoryViewSet._list reports a failure as a 500 body; keep it out of the cache
+        raise RuntimeError(f"{viewset.__name__}.list failed: {response.data}")
+    return response.data
+
+
+@replica_reads
+async def product_list(request):
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+    async def build():
+        return await sync_to_async(_list_page)(ProductViewSet, request)
+    return await acached_catalog_response(request, build)
+
+
+@replica_reads
+async def product_detail(request, pk):
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+    async def build():
+        products = [product async for product in catalog_profile(Product.objects.filter(status='Published', pk=pk))]
+        if not products:
+            raise Http404
+        return ProductSerializer(products[0], context={'request': request}).data
+    return await acached_catalog_response(request, build)
+
+
+@replica_reads
+async def discounted_products(request):
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+    async def build():
+        products = [product async for product in discounted_products_queryset()]
+        return ProductSerializer(products, many=True).data
+    return await acached_catalog_response(request, build)
+
+
+@replica_reads
+async def category_list(request):
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+    async def build():
+        return await sync_to_async(_list_page)(CategoryViewSet, request)
+    return await acached_catalog_response(request, build)
+
+
+async def paypal_webhook(request):
+    """Async paypal_webhook: the signature check awaits PayPal instead of blocking a thread"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        event = json.loads(request.body)
+    except ValueError:
+        event = None
+    if not isinstance(event, dict) or not event.get('id'):
+        return JsonResponse({'detail': 'Malformed event'}, status=400)
+
+    try:
+        verified = await AsyncPayPalClient().verify_webhook_signature(request.headers, event)
+    except PayPalError as e:
+        logger.error(f"PayPal webhook verification error: {e}")
+        return JsonResponse({'detail': 'Verification unavailable'}, status=503)
+    if not verified:
+        logger.warning(f"Rejected PayPal webhook {event.get('id')} with an invalid signature")
+        return JsonResponse({'detail': 'Invalid signature'}, status=400)
+
+    await sync_to_async(record_event)(event)
+    return JsonResponse({'status': 'received'})
+
+
+paypal_webhook.csrf_exempt = True
@@ -0,0 +1,128 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+from utils.renderers import ORJSONRenderer
+
+
+VERSION_KEY = 'catalog:version'
+HITS_KEY = 'catalog:hits'
+MISSES_KEY = 'catalog:misses'
+
+
+def get_catalog_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _incr(cache, key, initial=0):
+    # incr() raises on a missing key, so seed it first (add is a no-op if present)
+    cache.add(key, initial, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, initial + 1, timeout=None)
+        return initial + 1
+
+
+def get_catalog_version():
+    cache = get_catalog_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never restarts at a
+        # value that older cached responses were stored under.
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version(**kwargs):
+    """Signal handler: invalidate every cached catalog response."""
+    return _incr(get_catalog_cache(), VERSION_KEY, initial=int(time.time() * 1000))
+
+
+def _cache_key(request, version):
+    # DRF requests expose query_params; plain Django (async) views only GET
+    params = sorted(getattr(request, 'query_params', request.GET).lists())
+    digest = hashlib.md5(repr((request.get_host(), params)).encode()).hexdigest()
+    return f'catalog:v{version}:{request.path}:{digest}'
+
+
+def catalog_cache_key(request):
+    return _cache_key(request, get_catalog_version())
+
+
+def cached_catalog_response(request, build_response):
+    """
+    Return the cached body for a catalog GET, or call ``build_response()``
+    and cache its body under the current catalog version.  Catalog payloads
+    do not depend on the caller, so signed-in users share the same entries.
+    """
+    if request.method != 'GET':
+        return build_response()
+
+    cache = get_catalog_cache()
+    key = catalog_cache_key(request)
+    data = cache.get(key)
+    if data is not None:
+        _incr(cache, HITS_KEY)
+        return Response(data)
+
+    _incr(cache, MISSES_KEY)
+    response = build_response()
+    if response.status_code == 200:
+        cache.set(key, response.data, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return response
+
+
+def _json_response(data):
+    return HttpResponse(ORJSONRenderer().render(data), content_type=ORJSONRenderer.media_type)
+
+
+async def _aincr(cache, key, initial=0):
+    await cache.aadd(key, initial, timeout=None)
+    try:
+        return await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, initial + 1, timeout=None)
+        return initial + 1
+
+
+async def aget_catalog_version():
+    cache = get_catalog_cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+async def acached_catalog_response(request, build_data):
+    """
+    Async counterpart of cached_catalog_response for plain Django async views:
+    ``build_data`` is a coroutine function returning the payload, and the
+    result is rendered with the API's JSON renderer.
+    """
+    cache = get_catalog_cache()
+    key = _cache_key(request, await aget_catalog_version())
+    data = await cache.aget(key)
+    if data is not None:
+        await _aincr(cache, HITS_KEY)
+        return _json_response(data)
+
+    await _aincr(cache, MISSES_KEY)
+    data = await build_data()
+    await cache.aset(key, data, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return _json_response(data)
+
+
+def catalog_cache_stats():
+    cache = get_catalog_cache()
+    return {
+        'version': get_catalog_version(),
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+    }
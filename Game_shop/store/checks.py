@@ -0,0 +1,10 @@
+from django.core.checks import Tags, register
+
+from utils.checks import shared_cache_warnings
+
+
+@register(Tags.caches, deploy=True)
+def check_idempotency_cache(app_configs, **kwargs):
+    return shared_cache_warnings(
+        'IDEMPOTENCY_CACHE_ALIAS', 'Idempotency-Key replays only work within one worker', 'store.W001'
+    )
@@ -0,0 +1,229 @@
+"""
+Read-only serializers for the large list endpoints, built on ``.values()``.
+
+They produce the same documents as ProductSerializer, CartSerializer and
+OrderListSerializer (with its OrderItemListSerializer rows), but select only the rendered columns, attach related
+rows from plain dicts and build every media URL from one precomputed base,
+so no model instances, field objects or per-row ``build_absolute_uri``
+calls are involved.  Writes and detail routes keep the ModelSerializers.
+
+When a ModelSerializer above gains or loses a field, change it here too.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from .images import derivative_formats, derivative_name
+from .models import Cart, Gallery, Order, OrderItem, Product, Variant, VariantItem
+
+PRODUCT_COLUMNS = (
+    'id', 'name', 'image', 'description', 'category_id', 'category__title',
+    'price', 'regular_price', 'stock', 'status', 'featured', 'sku', 'slug',
+    'date', 'rating_avg', 'rating_count',
+    'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+)
+
+CART_COLUMNS = (
+    'id', 'product_id', 'user_id', 'qty', 'price', 'sub_total', 'shipping',
+    'tax', 'total', 'size', 'color', 'cart_id', 'date',
+)
+
+ORDER_COLUMNS = (
+    'id', 'customer_id', 'sub_total', 'shipping', 'tax', 'service_fee', 'total',
+    'payment_status', 'payment_method', 'order_status', 'order_id', 'payment_id', 'date',
+)
+
+ORDER_ITEM_COLUMNS = (
+    'id', 'order_id', 'order_status', 'qty', 'price', 'sub_total', 'shipping', 'tax', 'total',
+    'item_id', 'date', 'product_id', 'product__name', 'product__slug', 'product__image',
+    'product__price', 'game_key__key', 'game_key__status',
+)
+
+
+def decimal_str(value):
+    # DRF renders DecimalFields as fixed-point strings
+    return None if value is None else f'{value:f}'
+
+
+def datetime_str(value):
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = value.astimezone(timezone.get_current_timezone())
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class MediaURLs:
+    """Media and srcset URLs for one response, built from a single base URL."""
+
+    def __init__(self, request=None):
+        base = default_storage.url('')
+        self.base = request.build_absolute_uri(base) if request else base
+        self.absolute = request is not None
+        self.formats = derivative_formats()
+
+    def url(self, name):
+        return self.base + filepath_to_uri(name) if name else None
+
+    def srcset(self, name):
+        if not name:
+            return None
+        return {
+            fmt: {width: self.url(derivative_name(name, width, fmt)) for width in settings.IMAGE_DERIVATIVE_WIDTHS}
+            for fmt in self.formats
+        }
+
+
+def serialize_products(product_ids, media):
+    """ProductSerializer documents for ``product_ids``, in that order."""
+    product_ids = list(product_ids)
+    rows = {row['id']: row for row in Product.objects.filter(pk__in=product_ids).values(*PRODUCT_COLUMNS)}
+
+    variants = defaultdict(list)
+    variants_by_id = {}
+    for variant in Variant.objects.filter(product_id__in=product_ids).values('id', 'product_id', 'name'):
+        doc = variants_by_id[variant['id']] = {
+            'id': variant['id'], 'product': variant['product_id'], 'name': variant['name'], 'items': [],
+        }
+        variants[variant['product_id']].append(doc)
+    if variants_by_id:
+        for item in VariantItem.objects.filter(variant_id__in=list(variants_by_id)).values('id', 'variant_id', 'title', 'content'):
+            variants_by_id[item['variant_id']]['items'].append({
+                'id': item['id'], 'variant': item['variant_id'], 'title': item['title'], 'content': item['content'],
+            })
+
+    gallery = defaultdict(list)
+    for image in Gallery.objects.filter(product_id__in=product_ids).values('id', 'product_id', 'image', 'gallery_id'):
+        gallery[image['product_id']].append({
+            'id': image['id'],
+            'product': image['product_id'],
+            'image': media.url(image['image']),
+            'srcset': media.srcset(image['image']),
+            'gallery_id': image['gallery_id'],
+        })
+
+    documents = []
+    for pk in product_ids:
+        row = rows.get(pk)
+        if row is None:
+            continue
+        document = {
+            'id': row['id'],
+            'name': row['name'],
+            'image': media.url(row['image']),
+            'image_url': media.url(row['image']) if media.absolute else None,
+            'srcset': media.srcset(row['image']),
+            'description': row['description'],
+            'category': row['category_id'],
+            'category_name': row['category__title'],
+            'price': decimal_str(row['price']),
+            'regular_price': decimal_str(row['regular_price']),
+            'stock': row['stock'],
+            'status': row['status'],
+            'featured': row['featured'],
+            'sku': row['sku'],
+            'slug': row['slug'],
+            'date': row['date'].isoformat() if row['date'] else None,
+            'variants': variants[pk],
+            'gallery': gallery[pk],
+            'rating_avg': decimal_str(row['rating_avg']),
+            'rating_count': row['rating_count'],
+            'rating_histogram': {str(star): row[f'rating_{star}_count'] for star in range(1, 6)},
+        }
+        if row['category_id'] is None:
+            # DRF skips a read-only field whose source path hits None
+            del document['category_name']
+        documents.append(document)
+    return documents
+
+
+def serialize_cart(cart_ids, media):
+    """CartSerializer documents for ``cart_ids``, in that order."""
+    cart_ids = list(cart_ids)
+    rows = {row['id']: row for row in Cart.objects.filter(pk__in=cart_ids).values(*CART_COLUMNS)}
+    products = {doc['id']: doc for doc in serialize_products({row['product_id'] for row in rows.values()}, media)}
+    return [
+        {
+            'id': row['id'],
+            'product': products.get(row['product_id']),
+            'user': row['user_id'],
+            'qty': row['qty'],
+            'price': decimal_str(row['price']),
+            'sub_total': decimal_str(row['sub_total']),
+            'shipping': decimal_str(row['shipping']),
+            'tax': decimal_str(row['tax']),
+            'total': decimal_str(row['total']),
+            'size': row['size'],
+            'color': row['color'],
+            'cart_id': row['cart_id'],
+            'date': datetime_str(row['date']),
+        }
+        for row in (rows.get(pk) for pk in cart_ids) if row is not None
+    ]
+
+
+def serialize_order_items(order_ids, media):
+    """``{order_id: [OrderItemListSerializer document, ...]}`` for ``order_ids``."""
+    items = defaultdict(list)
+    for row in OrderItem.objects.filter(order_id__in=list(order_ids)).values(*ORDER_ITEM_COLUMNS):
+        items[row['order_id']].append({
+            'id': row['id'],
+            'order_status': row['order_status'],
+            'product': {
+                'id': row['product_id'],
+                'name': row['product__name'],
+                'slug': row['product__slug'],
+                'image': media.url(row['product__image']),
+                'image_url': media.url(row['product__image']) if media.absolute else None,
+                'price': decimal_str(row['product__price']),
+            },
+            'qty': row['qty'],
+            'price': decimal_str(row['price']),
+            'sub_total': decimal_str(row['sub_total']),
+            'shipping': decimal_str(row['shipping']),
+            'tax': decimal_str(row['tax']),
+            'total': decimal_str(row['total']),
+            'item_id': row['item_id'],
+            'date': datetime_str(row['date']),
+            'game_key': (
+                {'key': row['game_key__key'], 'status': row['game_key__status']}
+                if row['game_key__key'] is not None else None
+            ),
+        })
+    return items
+
+
+def serialize_orders(order_ids, media):
+    """OrderListSerializer documents for ``order_ids``, in that order."""
+    order_ids = list(order_ids)
+    rows = {row['id']: row for row in Order.objects.filter(pk__in=order_ids).values(*ORDER_COLUMNS)}
+    vendors = defaultdict(list)
+    for order_id, user_id in Order.vendor.through.objects.filter(order_id__in=order_ids).values_list('order_id', 'user_id'):
+        vendors[order_id].append(user_id)
+    items = serialize_order_items(order_ids, media)
+    return [
+        {
+            'id': row['id'],
+            'vendor': vendors[row['id']],
+            'customer': row['customer_id'],
+            'sub_total': decimal_str(row['sub_total']),
+            'shipping': decimal_str(row['shipping']),
+            'tax': decimal_str(row['tax']),
+            'service_fee': decimal_str(row['service_fee']),
+            'total': decimal_str(row['total']),
+            'payment_status': row['payment_status'],
+            'payment_method': row['payment_method'],
+            'order_status': row['order_status'],
+            'order_id': row['order_id'],
+            'payment_id': row['payment_id'],
+            'date': datetime_str(row['date']),
+            'order_items': items[row['id']],
+        }
+        for row in (rows.get(pk) for pk in order_ids) if row is not None
+    ]
@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GameKey, OrderItem
+
+
+class GameKeysUnavailable(Exception):
+    """Raised when an order must be fully keyed but a product is out of keys."""
+
+    def __init__(self, items):
+        self.items = items
+        names = ', '.join(sorted({item.product.name for item in items}))
+        super().__init__(f'No keys available for {names}')
+
+
+class GameKeyAllocator:
+    """
+    Hands out available GameKeys to order items.
+
+    Keys are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+    checkouts for the same product each take different rows instead of
+    blocking on (or double-selling) the first available one.
+    """
+
+    def allocate_order(self, order, require_all=False):
+        """Assign a key to every item of ``order`` that does not have one yet."""
+        return self.allocate_items(OrderItem.objects.filter(order=order), require_all=require_all)
+
+    def allocate_items(self, items, require_all=False):
+        """
+        Assign keys to the unkeyed rows of the ``items`` queryset in one
+        transaction.  Returns ``(assigned, missing)`` lists of OrderItems.
+        With ``require_all`` a shortage raises GameKeysUnavailable and
+        nothing is assigned.
+        """
+        with transaction.atomic():
+            # Locking the items makes a second capture of the same order wait
+            # and then see the keys this one assigned.
+            pending = list(
+                items.select_for_update(of=('self',))
+                .filter(game_key__isnull=True)
+                .select_related('product')
+                .order_by('id')
+            )
+
+            by_product = defaultdict(list)
+            for item in pending:
+                by_product[item.product_id].append(item)
+
+            assigned, missing = [], []
+            for product_id, product_items in by_product.items():
+                keys = self.claim(product_id, len(product_items))
+                for item, key in zip(product_items, keys):
+                    item.game_key = key
+                    assigned.append(item)
+                missing.extend(product_items[len(keys):])
+
+            if missing and require_all:
+                raise GameKeysUnavailable(missing)
+
+            if assigned:
+                keys_by_order = defaultdict(list)
+                for item in assigned:
+                    item.game_key.status = 'sold'
+                    item.game_key.order_id = item.order_id
+                    keys_by_order[item.order_id].append(item.game_key_id)
+                now = timezone.now()
+                for order_id, key_ids in keys_by_order.items():
+                    GameKey.objects.filter(id__in=key_ids).update(status='sold', order_id=order_id, updated_at=now)
+                OrderItem.objects.bulk_update(assigned, ['game_key'])
+
+        return assigned, missing
+
+    def claim(self, product_id, count):
+        """Lock up to ``count`` available keys for ``product_id``; must run inside a transaction."""
+        return list(
+            GameKey.objects.select_for_update(skip_locked=True)
+            .filter(product_id=product_id, status='available')
+            .order_by('id')[:count]
+        )
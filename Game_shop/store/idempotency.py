@@ -0,0 +1,73 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+# How long a request that is still running holds its key
+IN_PROGRESS_TIMEOUT = 60
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method}:{request.path}:{body}'.encode()).hexdigest()
+
+
+def idempotent(view_func):
+    """
+    Replay the stored response for a repeated ``Idempotency-Key`` header
+    instead of running the view again.  Place it under @api_view so the
+    request is already authenticated.  Requests without the header run as usual.
+
+    IDEMPOTENCY_CACHE_ALIAS must name a cache shared by every worker: with
+    locmem, a retry that lands on another process runs the view again
+    (``manage.py check --deploy`` warns, store.W001).
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view_func(request, *args, **kwargs)
+
+        cache = caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+        # Keys are scoped per user and endpoint, so clients cannot collide
+        scope = hashlib.sha256(f'{request.user.pk}:{request.path}:{key}'.encode()).hexdigest()
+        cache_key = f'idempotency:{scope}'
+        fingerprint = _fingerprint(request)
+
+        if not cache.add(cache_key, {'fingerprint': fingerprint, 'in_progress': True}, timeout=IN_PROGRESS_TIMEOUT):
+            stored = cache.get(cache_key)
+            if stored is None:
+                # Expired between add() and get(); let the client retry
+                return Response({'detail': 'Request with this Idempotency-Key is in progress'}, status=status.HTTP_409_CONFLICT)
+            if stored['fingerprint'] != fingerprint:
+                return Response(
+                    {'detail': 'Idempotency-Key was already used with a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if stored.get('in_progress'):
+                return Response({'detail': 'Request with this Idempotency-Key is in progress'}, status=status.HTTP_409_CONFLICT)
+            return Response(stored['data'], status=stored['status'], headers={'Idempotent-Replayed': 'true'})
+
+        try:
+            response = view_func(request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if response.status_code >= 500:
+            # Server errors are not final; the client may retry with the same key
+            cache.delete(cache_key)
+        else:
+            cache.set(
+                cache_key,
+                {'fingerprint': fingerprint, 'status': response.status_code, 'data': response.data},
+                timeout=settings.IDEMPOTENCY_KEY_TTL
+            )
+        return response
+
+    return wrapper
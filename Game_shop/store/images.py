@@ -0,0 +1,133 @@
+"""
+Resized WebP/AVIF derivatives of uploaded images.
+
+For an original stored as ``products/cover.jpg`` the derivatives are
+``derivatives/products/cover.jpg.<width>w.<format>``, one per width in
+IMAGE_DERIVATIVE_WIDTHS and format in IMAGE_DERIVATIVE_FORMATS.  Images are
+never upscaled, so every width always exists and ``srcset()`` can build URLs
+without touching the disk.
+
+Derivatives are written after an upload is saved (store/signals.py), by the
+generate_image_derivatives backfill command, or on first request by
+``serve_derivative`` when neither has run yet.
+"""
+import logging
+import os
+import re
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import Http404
+from PIL import Image, ImageOps, features
+
+from utils.media import media_response
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'derivatives'
+SAVE_OPTIONS = {
+    'webp': {'quality': 80, 'method': 4},
+    'avif': {'quality': 60},
+}
+DERIVATIVE_RE = re.compile(r'^(?P<name>.+)\.(?P<width>\d+)w\.(?P<fmt>[a-z0-9]+)$')
+
+
+@lru_cache(maxsize=None)
+def _pillow_supports(fmt):
+    return bool(features.check(fmt))
+
+
+def derivative_formats():
+    # AVIF needs a Pillow built with libavif; fall back to WebP alone without it
+    return [fmt for fmt in settings.IMAGE_DERIVATIVE_FORMATS if _pillow_supports(fmt)]
+
+
+def derivative_name(name, width, fmt):
+    return f'{DERIVATIVES_DIR}/{name}.{width}w.{fmt}'
+
+
+def srcset(image, build_url=None):
+    """``{format: {width: url}}`` for an ImageField value, or None if it is empty."""
+    if not image:
+        return None
+    build_url = build_url or (lambda url: url)
+    return {
+        fmt: {
+            width: build_url(default_storage.url(derivative_name(image.name, width, fmt)))
+            for width in settings.IMAGE_DERIVATIVE_WIDTHS
+        }
+        for fmt in derivative_formats()
+    }
+
+
+def _render(image, width, fmt):
+    if image.width > width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, format=fmt.upper(), **SAVE_OPTIONS.get(fmt, {}))
+    return buffer.getvalue()
+
+
+def generate_derivatives(name, overwrite=False):
+    """Write the missing derivatives of a stored original; returns how many were written."""
+    formats = derivative_formats()
+    wanted = [
+        (width, fmt)
+        for width in settings.IMAGE_DERIVATIVE_WIDTHS
+        for fmt in formats
+        if overwrite or not default_storage.exists(derivative_name(name, width, fmt))
+    ]
+    if not wanted:
+        return 0
+
+    with default_storage.open(name, 'rb') as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+    for width, fmt in wanted:
+        target = derivative_name(name, width, fmt)
+        if default_storage.exists(target):
+            default_storage.delete(target)
+        default_storage.save(target, ContentFile(_render(image, width, fmt)))
+    return len(wanted)
+
+
+def generate_derivatives_safely(name):
+    try:
+        return generate_derivatives(name)
+    except Exception as e:
+        logger.error(f"Could not generate derivatives for {name}: {str(e)}")
+        return 0
+
+
+def serve_derivative(request, path):
+    """Lazy fallback for ``MEDIA_URL/derivatives/<path>``: render on first request, then serve from disk."""
+    match = DERIVATIVE_RE.match(path)
+    if not match or '..' in path.split('/'):
+        raise Http404
+    name, width, fmt = match['name'], int(match['width']), match['fmt']
+    if width not in settings.IMAGE_DERIVATIVE_WIDTHS or fmt not in derivative_formats():
+        raise Http404
+    if not default_storage.exists(name):
+        raise Http404
+
+    target = derivative_name(name, width, fmt)
+    if not default_storage.exists(target):
+        generate_derivatives_safely(name)
+        if not default_storage.exists(target):
+            raise Http404
+    response = media_response(request, target)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def iter_originals(directories):
+    """Stored names of the original images under the given MEDIA_ROOT subdirectories."""
+    root = settings.MEDIA_ROOT
+    for directory in directories:
+        for dirpath, _, filenames in os.walk(os.path.join(root, directory)):
+            for filename in sorted(filenames):
+                yield os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, '/')
@@ -0,0 +1,36 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from store.images import generate_derivatives, iter_originals
+
+
+def _generate(name, overwrite):
+    try:
+        return name, generate_derivatives(name, overwrite=overwrite), None
+    except Exception as e:
+        return name, 0, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Write WebP/AVIF derivatives for existing uploads, using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directories', nargs='*', default=['products', 'images', 'categories'],
+                            help='MEDIA_ROOT subdirectories holding originals')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+        parser.add_argument('--overwrite', action='store_true', help='Re-render derivatives that already exist')
+
+    def handle(self, *args, **options):
+        names = list(iter_originals(options['directories']))
+        written = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            results = pool.map(_generate, names, [options['overwrite']] * len(names), chunksize=4)
+            for name, count, error in results:
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                written += count
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {len(names)} originals: {written} derivatives written, {failed} failed'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from store.models import Product
+from store.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute Product rating aggregates from active reviews, in id-ordered batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+        changed = 0
+        for start in range(0, len(ids), batch_size):
+            changed += rebuild_ratings(Product.objects.filter(id__in=ids[start:start + batch_size]))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates, {changed} of {len(ids)} products changed'))
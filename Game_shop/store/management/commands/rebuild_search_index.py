@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from store.models import Product
+from store.search import update_search_vector
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Product.search_vector for every product, in id-ordered batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+        updated = 0
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            updated += update_search_vector(Product.objects.filter(id__in=batch))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search vectors for {updated} products'))
@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-18 18:06
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# Same vector as store.search.product_search_vector(), for existing rows
+BACKFILL_SEARCH_VECTOR = """
+UPDATE store_product p SET search_vector =
+    setweight(to_tsvector('simple', coalesce(p.name, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce((SELECT c.title FROM store_category c WHERE c.id = p.category_id), '')), 'B')
+    || setweight(to_tsvector('simple', coalesce(regexp_replace(p.description, '<[^>]+>|&[#a-zA-Z0-9]+;', ' ', 'g'), '')), 'C');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_orderitem_game_key'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='product_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTOR, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gamekey',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['product', 'id'], name='gamekey_available_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-18 18:13
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayPalWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('event_type', models.CharField(max_length=100)),
+                ('resource_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('ignored', 'Ignored'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'PayPal Webhook Event',
+                'verbose_name_plural': 'PayPal Webhook Events',
+                'ordering': ['-received_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='payment_id',
+            field=models.CharField(blank=True, db_index=True, max_length=1000, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='paypalwebhookevent',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='paypalevent_pending_idx'),
+        ),
+    ]
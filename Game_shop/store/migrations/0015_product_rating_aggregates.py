@@ -0,0 +1,89 @@
+# Generated by Django 4.2 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+
+BACKFILL_RATINGS = """
+UPDATE store_product AS p
+SET rating_count = r.count,
+    rating_sum = r.total,
+    rating_avg = ROUND(r.total::numeric / r.count, 2),
+    rating_1_count = r.c1,
+    rating_2_count = r.c2,
+    rating_3_count = r.c3,
+    rating_4_count = r.c4,
+    rating_5_count = r.c5
+FROM (
+    SELECT product_id,
+           COUNT(*) AS count,
+           SUM(rating) AS total,
+           COUNT(*) FILTER (WHERE rating = 1) AS c1,
+           COUNT(*) FILTER (WHERE rating = 2) AS c2,
+           COUNT(*) FILTER (WHERE rating = 3) AS c3,
+           COUNT(*) FILTER (WHERE rating = 4) AS c4,
+           COUNT(*) FILTER (WHERE rating = 5) AS c5
+    FROM store_review
+    WHERE active AND product_id IS NOT NULL AND rating BETWEEN 1 AND 5
+    GROUP BY product_id
+) AS r
+WHERE p.id = r.product_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_order_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(BACKFILL_RATINGS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-rating_avg', '-rating_count', '-id'], name='product_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('active', True)), fields=['product', '-rating'], name='review_active_rating_idx'),
+        ),
+    ]
@@ -5,6 +5,8 @@ from shortuuid.django_fields import ShortUUIDField
 from django.utils import timezone
 from django.utils.text import slugify
 from django_ckeditor_5.fields import CKEditor5Field
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 from userauths import models as user_models
@@ -58,11 +60,21 @@ RATING = (
 
 
 
+class CategoryQuerySet(models.QuerySet):
+    def with_games_count(self):
+        """Annotate published_games_count for every category in one grouped query."""
+        return self.annotate(
+            published_games_count=models.Count('product', filter=models.Q(product__status='Published'))
+        )
+
+
 class Category(models.Model):
     title = models.CharField(max_length=255)
     image = models.ImageField(upload_to="categories/", null=True, blank=True)
     slug = models.SlugField(max_length=255, unique=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
@@ -77,7 +89,10 @@ class Category(models.Model):
 
     @property
     def games_count(self):
-        return self.product_set.count()
+        # Published games only; free when loaded via Category.objects.with_games_count()
+        if hasattr(self, 'published_games_count'):
+            return self.published_games_count
+        return self.product_set.filter(status='Published').count()
 
 class Product(models.Model):
     name = models.CharField(max_length=100)
@@ -94,6 +109,17 @@ class Product(models.Model):
     sku = ShortUUIDField(unique=True, length=5, max_length=50, prefix="SKU", alphabet="1234567890")
     slug = models.SlugField(null=True, blank=True)
     date = models.DateField(default=timezone.now)
+    # Maintained by store.search.update_search_vector (see store/signals.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Aggregates over active reviews, maintained by store.ratings (see store/signals.py)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
@@ -101,10 +127,33 @@ class Product(models.Model):
     class Meta:
         ordering = ['-id']
         verbose_name_plural = "Products"
+        indexes = [
+            GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+            GinIndex(fields=['name'], name='product_name_trgm', opclasses=['gin_trgm_ops']),
+            models.Index(fields=['-rating_avg', '-rating_count', '-id'], name='product_rating_idx'),
+            # Keyset pages of one category's published games
+            models.Index(fields=['category', '-id'], name='product_category_idx', condition=models.Q(status='Published')),
+        ]
+
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f'rating_{star}_count') for star, _ in RATING}
+
+    RATING_FIELDS = (
+        'rating_avg', 'rating_count', 'rating_sum',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+    )
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name) + "-" + str(shortuuid.uuid().lower()[:2])
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Rating aggregates are updated in place by store.ratings; a full save of
+            # an instance loaded earlier must not write stale values back
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.RATING_FIELDS
+            ]
         super(Product, self).save(*args, **kwargs)
 
 class Variant(models.Model):
@@ -112,7 +161,8 @@ class Variant(models.Model):
     name = models.CharField(max_length=1000, verbose_name="Variant Name", null=True, blank=True)
 
     def items(self):
-        return VariantItem.objects.filter(variant=self)
+        # Goes through the reverse manager so prefetched rows are reused
+        return self.variantitem_set.all()
 
     def __str__(self):
         return self.name
@@ -178,12 +228,17 @@ class Order(models.Model):
     # address = models.ForeignKey('customer.Address', on_delete=models.SET_NULL, null=True, blank=True)
     coupons = models.ManyToManyField(Coupon, blank=True)
     order_id = ShortUUIDField(length=6, max_length=25, unique=True, editable=False)
-    payment_id = models.CharField(max_length=1000, null=True, blank=True)
+    payment_id = models.CharField(max_length=1000, null=True, blank=True, db_index=True)
     date = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name_plural = "Order"
         ordering = ['-date']
+        indexes = [
+            # Order history keyset: customer's orders by (date, id), newest first
+            models.Index(fields=['customer', '-date', '-id'], name='order_customer_date_idx'),
+            models.Index(fields=['-date', '-id'], name='order_date_idx'),
+        ]
 
     def __str__(self):
         return self.order_id
@@ -225,17 +280,11 @@ class OrderItem(models.Model):
 
     def assign_game_key(self):
         if not self.game_key and self.product:
-            # Получаем доступный ключ для игры
-            available_key = GameKey.objects.filter(
-                product=self.product,
-                status='available'
-            ).first()
-            
-            if available_key:
-                available_key.status = 'sold'
-                available_key.save()
-                self.game_key = available_key
-                self.save()
+            from store.game_keys import GameKeyAllocator
+
+            assigned, _ = GameKeyAllocator().allocate_items(OrderItem.objects.filter(pk=self.pk))
+            if assigned:
+                self.game_key = assigned[0].game_key
                 return True
         return False
 
@@ -248,6 +297,12 @@ class Review(models.Model):
     active = models.BooleanField(default=False)
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', '-rating'], name='review_active_rating_idx', condition=models.Q(active=True)),
+            models.Index(fields=['product', '-id'], name='review_active_product_idx', condition=models.Q(active=True)),
+        ]
+
     def __str__(self):
         return f"{self.user.username} review on {self.product.name}"
 
@@ -281,6 +336,10 @@ class GameKey(models.Model):
         verbose_name = 'Game Key'
         verbose_name_plural = 'Game Keys'
         ordering = ['-created_at']
+        indexes = [
+            # Only available keys are ever scanned by GameKeyAllocator.claim
+            models.Index(fields=['product', 'id'], condition=models.Q(status='available'), name='gamekey_available_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.key} ({self.status})"
@@ -298,4 +357,81 @@ class GameKey(models.Model):
             self.status = 'sold'
             self.save()
             return True
-        return False
\ No newline at end of file
+        return False
+
+class OutboundEmail(models.Model):
+    """
+    Transactional email outbox.  Rows are written in the same transaction
+    as the order change that triggers them and delivered later by
+    ``manage.py drain_email_outbox``.
+    """
+    KIND_CHOICES = [
+        ('game_key', 'Game Key'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    order_item = models.ForeignKey(OrderItem, on_delete=models.CASCADE, null=True, blank=True, related_name='emails')
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Outbound Email'
+        verbose_name_plural = 'Outbound Emails'
+        ordering = ['-created_at']
+        constraints = [
+            # One email of each kind per order item, however often fulfillment runs
+            models.UniqueConstraint(fields=['kind', 'order_item'], name='outboundemail_unique_per_item'),
+        ]
+        indexes = [
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='pending'), name='outboundemail_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} to {self.recipient} ({self.status})"
+
+
+class PayPalWebhookEvent(models.Model):
+    """
+    A verified PayPal webhook delivery, stored once per PayPal event id and
+    applied to orders by ``manage.py process_paypal_events``.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    resource_id = models.CharField(max_length=255, null=True, blank=True)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'PayPal Webhook Event'
+        verbose_name_plural = 'PayPal Webhook Events'
+        ordering = ['-received_at']
+        indexes = [
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='pending'), name='paypalevent_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id} ({self.status})"
@@ -0,0 +1,133 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+# Retry after 1, 2, 4, ... minutes, capped at RETRY_MAX_DELAY
+RETRY_BASE_DELAY = timedelta(minutes=1)
+RETRY_MAX_DELAY = timedelta(hours=6)
+# How long a worker's claim on a batch keeps other workers off those rows
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+GAME_KEY_MESSAGE = """
+    Thank you for your purchase!
+    
+    Game: {game_name}
+    Key: {key}
+    
+    Please keep this key safe and do not share it with anyone.
+    If you have any issues activating your game, please contact our support.
+    
+    Enjoy your game!
+    """
+
+
+def enqueue_game_key_emails(email, order_items):
+    """
+    Queue one game-key email per item.  Call inside the transaction that
+    assigns the keys; items that already have an email are skipped.
+    """
+    OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            kind='game_key',
+            order_item=item,
+            recipient=email,
+            subject=f'Your game key for {item.product.name}',
+            body=GAME_KEY_MESSAGE.format(game_name=item.product.name, key=item.game_key.key),
+        )
+        for item in order_items
+    ], ignore_conflicts=True)
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def claim_batch(batch_size):
+    """
+    Take up to ``batch_size`` due emails for this worker.  The claim counts
+    as an attempt and moves ``next_attempt_at`` past CLAIM_TIMEOUT, so other
+    workers skip the rows; if this worker dies mid-batch they come due again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        for email in emails:
+            email.attempts += 1
+            email.next_attempt_at = now + CLAIM_TIMEOUT
+        OutboundEmail.objects.bulk_update(emails, ['attempts', 'next_attempt_at'])
+    return emails
+
+
+def record_failure(email, error):
+    email.last_error = str(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = 'failed'
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+
+
+def record_sent(email):
+    email.status = 'sent'
+    email.sent_at = timezone.now()
+    email.last_error = None
+    email.save(update_fields=['status', 'sent_at', 'last_error'])
+
+
+def deliver_batch(batch_size=100):
+    """
+    Send up to ``batch_size`` due emails over one mail connection.
+    Returns ``(sent, failed)`` counts.  No transaction is held while talking
+    to the mail server, and each row's outcome is saved right after its send,
+    so a crash resends at most the message in flight.
+    """
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # Mail server down or credentials rejected: back the whole batch off
+        logger.warning(f"Outbox mail connection failed, rescheduling {len(emails)} emails: {e}")
+        for email in emails:
+            record_failure(email, e)
+        return 0, len(emails)
+
+    sent = failed = 0
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject, email.body, settings.DEFAULT_FROM_EMAIL, [email.recipient],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                logger.warning(f"Outbox email {email.id} failed (attempt {email.attempts}): {e}")
+                record_failure(email, e)
+                failed += 1
+            else:
+                record_sent(email)
+                sent += 1
+    finally:
+        try:
+            connection.close()
+        except Exception as e:
+            logger.warning(f"Outbox mail connection did not close cleanly: {e}")
+    return sent, failed
@@ -0,0 +1,12 @@
+from utils.pagination import KeysetPagination
+
+
+class OrderCursorPagination(KeysetPagination):
+    """Keyset pagination over (date, id), newest first; no COUNT unless ?count=true."""
+    ordering = ('-date', '-id')
+    include_count = False
+
+
+class CategoryPagination(KeysetPagination):
+    """The storefront loads every category in one request; the cap only guards against runaway pages."""
+    page_size = 100
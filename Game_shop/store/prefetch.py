@@ -0,0 +1,35 @@
+from django.db.models import Prefetch
+
+from .models import OrderItem
+
+
+# Relations rendered by ProductSerializer: category.title, variant_set,
+# every Variant.items() and gallery_set.
+CATALOG_SELECT_RELATED = ('category',)
+CATALOG_PREFETCH_RELATED = ('variant_set', 'variant_set__variantitem_set', 'gallery_set')
+
+
+def catalog_profile(queryset, prefix=''):
+    """
+    Apply the catalog prefetch profile to ``queryset``.
+
+    ``prefix`` is the lookup path from the queryset's model to Product,
+    e.g. ``'product__'`` for Cart, OrderItem and Wishlist.  The number of
+    queries then stays fixed no matter how many products are serialized.
+    """
+    return queryset.select_related(
+        *(prefix + lookup for lookup in CATALOG_SELECT_RELATED)
+    ).prefetch_related(
+        *(prefix + lookup for lookup in CATALOG_PREFETCH_RELATED)
+    )
+
+
+def order_items_prefetch(lookup='orderitem_set'):
+    """Prefetch for Order.orderitem_set as rendered by OrderItemSerializer."""
+    return Prefetch(
+        lookup,
+        queryset=catalog_profile(
+            OrderItem.objects.select_related('game_key').prefetch_related('coupons'),
+            prefix='product__',
+        ),
+    )
@@ -0,0 +1,89 @@
+"""
+Review aggregates stored on Product: rating_count, rating_sum, rating_avg and
+one rating_<n>_count column per star.
+
+Only active reviews count.  store.signals applies the change of a single
+review as a delta, in one UPDATE; ``rebuild_ratings`` recomputes products
+from Review for backfill and for queryset.update() changes that send no
+signals (``manage.py rebuild_ratings``).
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from .cache import bump_catalog_version
+from .models import Product, Review, RATING
+
+STARS = [star for star, _ in RATING]
+CENT = Decimal('0.01')
+
+
+def contribution(review):
+    """``(product_id, rating)`` a review adds to the aggregates, or None."""
+    if review.active and review.product_id and review.rating in STARS:
+        return review.product_id, review.rating
+    return None
+
+
+def apply_delta(product_id, rating, sign):
+    """Add (sign=1) or remove (sign=-1) one rating from a product's aggregates."""
+    new_count = F('rating_count') + sign
+    new_sum = F('rating_sum') + sign * rating
+    Product.objects.filter(pk=product_id).update(
+        rating_count=new_count,
+        rating_sum=new_sum,
+        rating_avg=Coalesce(
+            ExpressionWrapper(new_sum * Decimal('1.0') / NullIf(new_count, 0), output_field=DecimalField()),
+            Value(Decimal('0')),
+        ),
+        **{f'rating_{rating}_count': F(f'rating_{rating}_count') + sign},
+    )
+
+
+def review_changed(before, after):
+    """Move a review's contribution from ``before`` to ``after`` (either may be None)."""
+    if before == after:
+        return
+    if before:
+        apply_delta(*before, sign=-1)
+    if after:
+        apply_delta(*after, sign=1)
+    bump_catalog_version()
+
+
+def rebuild_ratings(products=None):
+    """Recompute aggregates for ``products`` (all products by default); returns how many changed."""
+    products = Product.objects.all() if products is None else products
+    reviews = Review.objects.filter(active=True, rating__in=STARS, product__in=products)
+    stats = {
+        row['product']: row
+        for row in reviews.values('product').annotate(
+            count=Count('id'),
+            total=Sum('rating'),
+            **{f'c{star}': Count('id', filter=Q(rating=star)) for star in STARS},
+        ).order_by()
+    }
+    fields = ['rating_count', 'rating_sum', 'rating_avg'] + [f'rating_{star}_count' for star in STARS]
+
+    changed = []
+    for product in products.only(*fields):
+        row = stats.get(product.pk, {})
+        values = {
+            'rating_count': row.get('count', 0),
+            'rating_sum': row.get('total') or 0,
+            **{f'rating_{star}_count': row.get(f'c{star}', 0) for star in STARS},
+        }
+        values['rating_avg'] = (
+            (Decimal(values['rating_sum']) / values['rating_count']).quantize(CENT, rounding=ROUND_HALF_UP)
+            if values['rating_count'] else Decimal('0.00')
+        )
+        if any(getattr(product, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(product, field, value)
+            changed.append(product)
+
+    Product.objects.bulk_update(changed, fields, batch_size=500)
+    if changed:
+        bump_catalog_version()
+    return len(changed)
@@ -0,0 +1,59 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db.models import F, Func, OuterRef, Q, Subquery, Value
+
+from .models import Category
+
+
+# 'simple' keeps game titles intact instead of stemming them as English words
+SEARCH_CONFIG = 'simple'
+
+
+class StripTags(Func):
+    """SQL-side equivalent of django.utils.html.strip_tags for CKEditor HTML."""
+    function = 'regexp_replace'
+    template = "%(function)s(%(expressions)s, '<[^>]+>|&[#a-zA-Z0-9]+;', ' ', 'g')"
+
+
+def product_search_vector():
+    """
+    tsvector over name (A), category title (B) and the tag-stripped
+    description (C).  Written with Product.objects.update(), so the
+    category title has to come from a subquery instead of a join.
+    """
+    category_title = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('title')[:1])
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(category_title, weight='B', config=SEARCH_CONFIG)
+        + SearchVector(StripTags('description'), weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(queryset):
+    return queryset.update(search_vector=product_search_vector())
+
+
+def build_search_query(text):
+    """
+    Prefix query for every word typed so far, so 'witch 3' matches
+    'The Witcher 3' while the user is still typing.
+    """
+    terms = re.findall(r'\w+', text)
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_products(queryset, text):
+    """Filter ``queryset`` to products matching ``text``, best matches first."""
+    text = text.strip()
+    search_query = build_search_query(text)
+    if search_query is None:
+        return queryset.none()
+
+    return queryset.annotate(
+        rank=SearchRank(F('search_vector'), search_query) + TrigramWordSimilarity(text, 'name'),
+    ).filter(
+        Q(search_vector=search_query) | Q(name__trigram_word_similar=text)
+    ).order_by('-rank', '-id')
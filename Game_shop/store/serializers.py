@@ -1,13 +1,30 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
 from rest_framework import serializers
 from .models import Category, Product, Variant, VariantItem, Gallery, Cart, Order, OrderItem, Review, Wishlist, GameKey
+from .images import srcset
+from .prefetch import order_items_prefetch
+
+TAX_RATE = Decimal('0.10')  # 10% tax rate
+SERVICE_FEE_RATE = Decimal('0.05')  # 5% service fee
+CENT = Decimal('0.01')
+
+class ImageSrcsetField(serializers.ReadOnlyField):
+    """``{format: {width: url}}`` of the resized derivatives (store/images.py)"""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        return srcset(value, request.build_absolute_uri if request else None)
 
 class CategorySerializer(serializers.ModelSerializer):
     games_count = serializers.IntegerField(read_only=True)
     image_url = serializers.SerializerMethodField()
+    srcset = ImageSrcsetField(source='image')
 
     class Meta:
         model = Category
-        fields = ['id', 'title', 'slug', 'image', 'image_url', 'games_count']
+        fields = ['id', 'title', 'slug', 'image', 'image_url', 'srcset', 'games_count']
 
     def get_image_url(self, obj):
         if obj.image:
@@ -24,9 +41,11 @@ class CategorySerializer(serializers.ModelSerializer):
         return representation
 
 class GallerySerializer(serializers.ModelSerializer):
+    srcset = ImageSrcsetField(source='image')
+
     class Meta:
         model = Gallery
-        fields = ['id', 'product', 'image', 'gallery_id']
+        fields = ['id', 'product', 'image', 'srcset', 'gallery_id']
 
 class VariantItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -45,14 +64,17 @@ class ProductSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
     variants = VariantSerializer(many=True, read_only=True, source='variant_set')
     gallery = GallerySerializer(many=True, read_only=True, source='gallery_set')
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+    srcset = ImageSrcsetField(source='image')
     
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'image', 'image_url', 'description', 
+            'id', 'name', 'image', 'image_url', 'srcset', 'description', 
             'category', 'category_name', 'price', 'regular_price',
             'stock', 'status', 'featured', 'sku', 'slug',
-            'date', 'variants', 'gallery'
+            'date', 'variants', 'gallery',
+            'rating_avg', 'rating_count', 'rating_histogram'
         ]
 
     def get_image_url(self, obj):
@@ -62,6 +84,23 @@ class ProductSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image.url)
         return None
 
+class ProductSuggestSerializer(serializers.ModelSerializer):
+    """Minimal payload for the navbar search dropdown"""
+    image = serializers.SerializerMethodField()
+    srcset = ImageSrcsetField(source='image')
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'image', 'srcset', 'price']
+
+    def get_image(self, obj):
+        if obj.image:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.image.url)
+            return obj.image.url
+        return None
+
 class CartSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     
@@ -100,7 +139,53 @@ class OrderItemSerializer(serializers.ModelSerializer):
             'item_id', 'vendor', 'date', 'game_key'
         ]
 
+class OrderItemProductSerializer(serializers.ModelSerializer):
+    """Product summary for order history rows, without variants or gallery"""
+    image_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'slug', 'image', 'image_url', 'price']
+
+    def get_image_url(self, obj):
+        if obj.image:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.image.url)
+        return None
+
+class OrderItemListSerializer(serializers.ModelSerializer):
+    product = OrderItemProductSerializer(read_only=True)
+    game_key = GameKeySerializer(read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = [
+            'id', 'order_status', 'product', 'qty', 'price',
+            'sub_total', 'shipping', 'tax', 'total',
+            'item_id', 'date', 'game_key'
+        ]
+
+class OrderListSerializer(serializers.ModelSerializer):
+    """Order history rows; the full item tree is served by the detail route"""
+    order_items = OrderItemListSerializer(many=True, read_only=True, source='orderitem_set')
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'vendor', 'customer', 'sub_total', 'shipping',
+            'tax', 'service_fee', 'total', 'payment_status',
+            'payment_method', 'order_status', 'order_id', 'payment_id',
+            'date', 'order_items'
+        ]
+
+class OrderLineSerializer(serializers.Serializer):
+    """One cart line of a checkout POST; the price comes from the product"""
+    product = serializers.IntegerField(min_value=1)
+    qty = serializers.IntegerField(min_value=1, default=1)
+
 class OrderSerializer(serializers.ModelSerializer):
+    # On create, order_items is read as OrderLineSerializer lines instead
     order_items = OrderItemSerializer(many=True, read_only=True, source='orderitem_set')
     
     class Meta:
@@ -112,22 +197,74 @@ class OrderSerializer(serializers.ModelSerializer):
             'saved', 'coupons', 'order_id', 'payment_id',
             'date', 'order_items'
         ]
-        read_only_fields = ['customer']
-    
+        # Only the PayPal capture path (store/webhooks.py) marks an order Paid;
+        # totals and vendors are computed from the products on create
+        read_only_fields = [
+            'customer', 'vendor', 'payment_status',
+            'sub_total', 'shipping', 'tax', 'service_fee', 'total'
+        ]
+
+    def to_internal_value(self, data):
+        validated_data = super().to_internal_value(data)
+        if self.instance is None:
+            lines = OrderLineSerializer(data=data.get('order_items', []), many=True, allow_empty=False)
+            if not lines.is_valid():
+                raise serializers.ValidationError({'order_items': lines.errors})
+            # One query for every product in the cart
+            products = Product.objects.in_bulk({line['product'] for line in lines.validated_data})
+            missing = sorted({line['product'] for line in lines.validated_data} - products.keys())
+            if missing:
+                raise serializers.ValidationError({'order_items': [f"Product with ID {product_id} not found" for product_id in missing]})
+            validated_data['lines'] = [(products[line['product']], line['qty']) for line in lines.validated_data]
+        return validated_data
+
     def create(self, validated_data):
+        """
+        Price the order from its products and write it, its items (one bulk
+        insert) and its vendor rows (one bulk insert on the through table)
+        as one unit.
+        """
+        items = [
+            OrderItem(
+                product=product,
+                qty=qty,
+                price=product.price,
+                sub_total=product.price * qty,
+                shipping=(product.shipping or Decimal('0.00')) * qty,
+                vendor_id=product.vendor_id
+            )
+            for product, qty in validated_data.pop('lines')
+        ]
+        sub_total = sum((item.sub_total for item in items), Decimal('0.00'))
+        shipping = sum((item.shipping for item in items), Decimal('0.00'))
+        tax = (sub_total * TAX_RATE).quantize(CENT, rounding=ROUND_HALF_UP)
+        service_fee = (sub_total * SERVICE_FEE_RATE).quantize(CENT, rounding=ROUND_HALF_UP)
+        validated_data.update(
+            payment_status='Processing',
+            sub_total=sub_total,
+            shipping=shipping,
+            tax=tax,
+            service_fee=service_fee,
+            total=sub_total + shipping + tax + service_fee,
+        )
+
         # Explicitly set customer from the authenticated user
         request = self.context.get('request')
         if request and hasattr(request, 'user') and request.user.is_authenticated:
             validated_data['customer'] = request.user
-            
-        order = super().create(validated_data)
-        
-        # Double-check that customer was set
-        if not order.customer and request and hasattr(request, 'user') and request.user.is_authenticated:
-            order.customer = request.user
-            order.save()
-            
-        return order
+
+        with transaction.atomic():
+            order = super().create(validated_data)
+            for item in items:
+                item.order = order
+            OrderItem.objects.bulk_create(items)
+            Order.vendor.through.objects.bulk_create([
+                Order.vendor.through(order_id=order.id, user_id=vendor_id)
+                for vendor_id in {item.vendor_id for item in items if item.vendor_id}
+            ])
+
+        # The response renders every item; read them back with the catalog prefetch profile
+        return Order.objects.prefetch_related('vendor', 'coupons', order_items_prefetch()).get(pk=order.pk)
 
 class WishlistSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
@@ -0,0 +1,57 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .images import generate_derivatives_safely
+from .models import Category, Product, Variant, VariantItem, Gallery, Review
+from .ratings import contribution, review_changed
+from .search import update_search_vector
+
+
+# Any change to a model rendered by the catalog endpoints invalidates the cache
+for model in (Product, Category, Variant, VariantItem, Gallery):
+    post_save.connect(bump_catalog_version, sender=model, dispatch_uid=f'catalog_version_save_{model.__name__}')
+    post_delete.connect(bump_catalog_version, sender=model, dispatch_uid=f'catalog_version_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, **kwargs):
+    # queryset.update() does not send post_save, so this cannot recurse
+    update_search_vector(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def update_category_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vector(Product.objects.filter(category=instance))
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_contribution(sender, instance, **kwargs):
+    before = None
+    if instance.pk:
+        stored = Review.objects.filter(pk=instance.pk).only('product_id', 'rating', 'active').first()
+        if stored is not None:
+            before = contribution(stored)
+    instance._rating_before = before
+
+
+@receiver(post_save, sender=Review)
+def update_product_rating(sender, instance, **kwargs):
+    review_changed(getattr(instance, '_rating_before', None), contribution(instance))
+
+
+@receiver(post_delete, sender=Review)
+def remove_product_rating(sender, instance, **kwargs):
+    review_changed(contribution(instance), None)
+
+
+def create_image_derivatives(sender, instance, **kwargs):
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: generate_derivatives_safely(name))
+
+
+for model in (Product, Category, Gallery):
+    post_save.connect(create_image_derivatives, sender=model, dispatch_uid=f'image_derivatives_{model.__name__}')
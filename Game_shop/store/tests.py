@@ -1,3 +1,593 @@
-from django.test import TestCase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import requests
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from userauths.models import User
+from userauths.serializers import MyTokenObtainPairSerializer
+from utils.pagination import KeysetPagination
+from utils.renderers import ORJSONRenderer
+from utils import paypal
+
+from .game_keys import GameKeyAllocator
+from . import outbox, webhooks
+from .cache import bump_catalog_version
+from .fast_serializers import MediaURLs, serialize_cart, serialize_orders, serialize_products
+from .models import (
+    Cart, Category, Gallery, GameKey, Order, OrderItem, OutboundEmail, PayPalWebhookEvent, Product, Review, Variant, VariantItem, Wishlist
+)
+from .prefetch import catalog_profile, order_items_prefetch
+from .serializers import CartSerializer, OrderListSerializer, OrderSerializer, ProductSerializer, WishlistSerializer
+
+
+def make_products(count, category=None, **fields):
+    """Published products with one variant, one variant item and one gallery image each"""
+    products = []
+    for _ in range(count):
+        number = Product.objects.count() + 1
+        product = Product.objects.create(
+            name=f'Game {number}', description='<p>game</p>', category=category,
+            price=Decimal('10.00'), regular_price=Decimal('20.00'), sku=f'SKU{number}', **fields
+        )
+        variant = Variant.objects.create(product=product, name='Edition')
+        VariantItem.objects.create(variant=variant, title='Standard', content='Base game')
+        products.append(product)
+    # bulk_create skips the post_save hook that renders image derivatives into MEDIA_ROOT
+    Gallery.objects.bulk_create([Gallery(product=product, image='images/game.jpg') for product in products])
+    return products
+
+
+class CatalogQueryCountTests(TestCase):
+    """The catalog prefetch profile keeps the query count fixed whatever the page size"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(title='RPG')
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+
+    def test_product_serializer(self):
+        # products + category, variants, variant items, gallery
+        for count in (1, 10):
+            make_products(count, self.category)
+            with self.assertNumQueries(4):
+                ProductSerializer(catalog_profile(Product.objects.all()), many=True).data
+
+    def test_cart_and_wishlist_serializers(self):
+        for count in (1, 10):
+            for product in make_products(count, self.category):
+                Cart.objects.create(product=product, user=self.user, qty=1, price=product.price)
+                Wishlist.objects.create(product=product, user=self.user)
+            with self.assertNumQueries(4):
+                CartSerializer(catalog_profile(Cart.objects.all(), prefix='product__'), many=True).data
+            with self.assertNumQueries(4):
+                WishlistSerializer(catalog_profile(Wishlist.objects.all(), prefix='product__'), many=True).data
+
+    def test_order_serializer(self):
+        # orders, vendors, coupons, items + game keys + products + categories,
+        # item coupons, variants, variant items, gallery
+        for count in (1, 10):
+            order = Order.objects.create(customer=self.user, total=Decimal('10.00'))
+            for product in make_products(count, self.category):
+                OrderItem.objects.create(order=order, product=product, qty=1, price=product.price)
+            orders = Order.objects.prefetch_related('vendor', 'coupons', order_items_prefetch())
+            with self.assertNumQueries(8):
+                OrderSerializer(orders, many=True).data
+
+    def test_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        urls = ['/api/products/', f'/api/categories/{self.category.pk}/products/', '/api/cart/', '/api/orders/', '/api/wishlist/']
+        counts = []
+        for count in (2, 12):
+            order = Order.objects.create(customer=self.user, total=Decimal('10.00'))
+            for product in make_products(count, self.category):
+                Cart.objects.create(product=product, user=self.user, qty=1, price=product.price)
+                Wishlist.objects.create(product=product, user=self.user)
+                OrderItem.objects.create(order=order, product=product, qty=1, price=product.price)
+            cache.clear()
+            sizes = {}
+            for url in urls:
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+                sizes[url] = len(queries)
+            counts.append(sizes)
+        self.assertEqual(counts[0], counts[1])
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class GameKeyAllocatorConcurrencyTests(TransactionTestCase):
+    """Concurrent captures racing for the same products never share a key"""
+
+    CAPTURES = 200
+    # Each thread holds its own connection; Postgres ships with max_connections = 100
+    THREADS = 50
+
+    def test_concurrent_captures(self):
+        user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        scarce, plentiful = make_products(2)
+        GameKey.objects.bulk_create(
+            [GameKey(product=scarce, key=f'SCARCE-{n}') for n in range(150)]
+            + [GameKey(product=plentiful, key=f'PLENTY-{n}') for n in range(300)]
+        )
+        # 160 orders; the first 40 are captured twice (redirect and webhook racing)
+        orders = []
+        for _ in range(160):
+            order = Order.objects.create(customer=user)
+            OrderItem.objects.create(order=order, product=scarce, qty=1)
+            OrderItem.objects.create(order=order, product=plentiful, qty=1)
+            orders.append(order)
+        captures = orders + orders[:self.CAPTURES - len(orders)]
+
+        start = threading.Barrier(self.THREADS)
+        started = threading.local()
+
+        def capture(order):
+            if not getattr(started, 'done', False):
+                start.wait()
+                started.done = True
+            try:
+                return GameKeyAllocator().allocate_order(order)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            results = list(pool.map(capture, captures))
+
+        assigned = [item for items, _ in results for item in items]
+        # Every key went to exactly one item, and a second capture assigned nothing new
+        self.assertEqual(len({item.game_key_id for item in assigned}), len(assigned))
+        self.assertEqual(len({item.id for item in assigned}), len(assigned))
+
+        items = OrderItem.objects.select_related('game_key')
+        self.assertEqual(items.filter(product=scarce, game_key__isnull=False).count(), 150)
+        self.assertEqual(items.filter(product=plentiful, game_key__isnull=False).count(), 160)
+        self.assertEqual(GameKey.objects.filter(product=scarce, status='available').count(), 0)
+        self.assertEqual(GameKey.objects.filter(product=plentiful, status='available').count(), 140)
+        for item in items.filter(game_key__isnull=False):
+            self.assertEqual(item.game_key.status, 'sold')
+            self.assertEqual(item.game_key.order_id, item.order_id)
+
+
+class EmailOutboxTests(TestCase):
+    """Outbox delivery over Django's locmem email backend (the test runner default)"""
+
+    def setUp(self):
+        user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        order = Order.objects.create(customer=user)
+        self.items = []
+        for number, product in enumerate(make_products(3)):
+            key = GameKey.objects.create(product=product, key=f'KEY-{number}', status='sold', order=order)
+            self.items.append(OrderItem.objects.create(order=order, product=product, qty=1, game_key=key))
+        outbox.enqueue_game_key_emails(user.email, self.items)
+
+    def test_enqueue_once_per_item(self):
+        outbox.enqueue_game_key_emails('buyer@example.com', self.items)
+        self.assertEqual(OutboundEmail.objects.count(), 3)
+
+    def test_deliver_batch(self):
+        self.assertEqual(outbox.deliver_batch(), (3, 0))
+        self.assertEqual(sorted(message.subject for message in mail.outbox), [f'Your game key for Game {n}' for n in (1, 2, 3)])
+        self.assertIn('KEY-0', mail.outbox[0].body)
+        self.assertEqual(OutboundEmail.objects.filter(status='sent', attempts=1, sent_at__isnull=False).count(), 3)
+        # Sent rows are never delivered again
+        self.assertEqual(outbox.deliver_batch(), (0, 0))
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_send_backs_off_then_gives_up(self):
+        with mock.patch('store.outbox.EmailMessage.send', side_effect=OSError('mailbox unavailable')):
+            self.assertEqual(outbox.deliver_batch(), (0, 3))
+        email = OutboundEmail.objects.first()
+        self.assertEqual((email.status, email.attempts, email.last_error), ('pending', 1, 'mailbox unavailable'))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(outbox.deliver_batch(), (0, 0))
+
+        OutboundEmail.objects.update(attempts=outbox.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+        with mock.patch('store.outbox.EmailMessage.send', side_effect=OSError('mailbox unavailable')):
+            outbox.deliver_batch()
+        self.assertEqual(OutboundEmail.objects.filter(status='failed').count(), 3)
+
+    def test_connection_failure_reschedules_batch(self):
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=ConnectionRefusedError('smtp down')):
+            self.assertEqual(outbox.deliver_batch(), (0, 3))
+        self.assertEqual(len(mail.outbox), 0)
+        for email in OutboundEmail.objects.all():
+            self.assertEqual((email.status, email.attempts, email.last_error), ('pending', 1, 'smtp down'))
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+    def test_each_send_is_recorded_before_the_next(self):
+        sends = []
+
+        def send_then_crash(message):
+            if sends:
+                raise KeyboardInterrupt
+            sends.append(message)
+            return 1
+
+        with mock.patch('store.outbox.EmailMessage.send', autospec=True, side_effect=send_then_crash):
+            with self.assertRaises(KeyboardInterrupt):
+                outbox.deliver_batch()
+        # The first email is recorded as sent; the one in flight stays claimed and comes due later
+        self.assertEqual(OutboundEmail.objects.filter(status='sent').count(), 1)
+        claimed = OutboundEmail.objects.filter(status='pending')
+        self.assertEqual(claimed.count(), 2)
+        self.assertTrue(all(email.next_attempt_at > timezone.now() for email in claimed))
+
+    def test_drain_command(self):
+        out = StringIO()
+        call_command('drain_email_outbox', stdout=out)
+        self.assertIn('3 sent, 0 failed', out.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+
+
+class PayPalWebhookTests(TestCase):
+
+    def setUp(self):
+        paypal.clear_token_cache()
+        self.addCleanup(paypal.clear_token_cache)
+
+    def test_verification_timeout_is_retryable(self):
+        session = mock.Mock()
+        session.post.side_effect = requests.Timeout('read timed out')
+        with mock.patch('utils.paypal.get_session', return_value=session):
+            response = APIClient().post('/api/payments/paypal/webhook/', {'id': 'WH-1', 'event_type': 'PAYMENT.CAPTURE.COMPLETED'}, format='json')
+        # 503 makes PayPal redeliver the event
+        self.assertEqual(response.status_code, 503)
+
+
+class PayPalEventProcessingTests(TransactionTestCase):
+    """process_paypal_events: no transaction is held across PayPal calls"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        self.order = Order.objects.create(customer=self.user, payment_id='PAYPAL-1', payment_status='Processing', total=Decimal('10.00'))
+
+    def record(self, event_id, event_type):
+        webhooks.record_event({'id': event_id, 'event_type': event_type, 'resource': {'id': 'PAYPAL-1'}})
+
+    def test_capture_runs_outside_the_batch_transaction(self):
+        self.record('WH-1', 'CHECKOUT.ORDER.APPROVED')
+        self.record('WH-2', 'CUSTOMER.DISPUTE.CREATED')
+        in_transaction = []
+        with mock.patch('store.webhooks.PayPalClient') as client:
+            client.return_value.capture_order.side_effect = lambda order_id: in_transaction.append(connection.in_atomic_block)
+            self.assertEqual(webhooks.process_batch(), 2)
+        client.return_value.capture_order.assert_called_once_with('PAYPAL-1')
+        self.assertEqual(in_transaction, [False])
+        self.assertEqual(dict(PayPalWebhookEvent.objects.values_list('event_id', 'status')), {'WH-1': 'processed', 'WH-2': 'ignored'})
+
+    def test_failed_capture_backs_off(self):
+        self.record('WH-1', 'CHECKOUT.ORDER.APPROVED')
+        with mock.patch('store.webhooks.PayPalClient') as client:
+            client.return_value.capture_order.side_effect = paypal.PayPalError('PayPal POST failed')
+            webhooks.process_batch()
+        event = PayPalWebhookEvent.objects.get()
+        self.assertEqual((event.status, event.attempts, event.last_error), ('pending', 1, 'PayPal POST failed'))
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(webhooks.process_batch(), 0)
+
+    def test_already_captured_order_is_processed(self):
+        self.record('WH-1', 'CHECKOUT.ORDER.APPROVED')
+        response = mock.Mock(**{'json.return_value': {'name': 'UNPROCESSABLE_ENTITY', 'details': [{'issue': 'ORDER_ALREADY_CAPTURED'}]}})
+        with mock.patch('store.webhooks.PayPalClient') as client:
+            client.return_value.capture_order.side_effect = paypal.PayPalError('PayPal POST failed', status_code=422, response=response)
+            webhooks.process_batch()
+        self.assertEqual(PayPalWebhookEvent.objects.get().status, 'processed')
+
+    def test_capture_of_a_paid_order_allocates_its_keys(self):
+        product, = make_products(1)
+        item = OrderItem.objects.create(order=self.order, product=product, qty=1, price=Decimal('10.00'))
+        key = GameKey.objects.create(product=product, key='KEY-1')
+        Order.objects.filter(pk=self.order.pk).update(payment_status='Paid')
+        webhooks.record_event({
+            'id': 'WH-1', 'event_type': 'PAYMENT.CAPTURE.COMPLETED',
+            'resource': {'id': 'CAPTURE-1', 'amount': {'value': '10.00', 'currency_code': 'USD'},
+                         'supplementary_data': {'related_ids': {'order_id': 'PAYPAL-1'}}},
+        })
+        webhooks.process_batch()
+        item.refresh_from_db()
+        self.assertEqual(item.game_key_id, key.id)
+        self.assertEqual(OutboundEmail.objects.get().order_item_id, item.id)
+        self.assertEqual(PayPalWebhookEvent.objects.get().status, 'processed')
+
+    def test_status_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f'/api/orders/{self.order.order_id}/status/'
+        self.assertEqual(client.get(url).data['payment_status'], 'Processing')
+        Order.objects.filter(pk=self.order.pk).update(payment_status='Paid')
+        self.assertEqual(client.get(url).data['payment_status'], 'Paid')
+
+        # Other customers' orders are not visible
+        other = User.objects.create_user(email='other@example.com', username='other', password='secret')
+        client.force_authenticate(other)
+        self.assertEqual(client.get(url).status_code, 404)
+
+
+class IdempotentCheckoutTests(TestCase):
+    """POST /api/orders/ (OrderViewSet.create) with an Idempotency-Key header"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(email='buyer@example.com', username='buyer', password='secret'))
+        product, = make_products(1)
+        self.order = {'payment_method': 'PayPal', 'order_items': [{'product': product.id, 'qty': 1}]}
+
+    def test_repeat_replays_the_first_response(self):
+        first = self.client.post('/api/orders/', self.order, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(first.status_code, 201)
+        repeat = self.client.post('/api/orders/', self.order, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(repeat.status_code, 201)
+        self.assertEqual(repeat['Idempotent-Replayed'], 'true')
+        self.assertEqual(repeat.data['order_id'], first.data['order_id'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_client_cannot_mark_an_order_paid(self):
+        response = self.client.post('/api/orders/', {**self.order, 'payment_status': 'Paid'}, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(response.data['payment_status'], 'Processing')
+        self.assertEqual(Order.objects.get().payment_status, 'Processing')
+
+    def test_key_reused_with_another_body(self):
+        self.client.post('/api/orders/', self.order, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+        other = {**self.order, 'order_items': [{**self.order['order_items'][0], 'qty': 2}]}
+        response = self.client.post('/api/orders/', other, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class OrderCreateTests(TestCase):
+    """POST /api/orders/ prices the cart on the server and writes it in bulk"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        self.client.force_authenticate(self.user)
+        self.vendors = [User.objects.create_user(email=f'vendor{n}@example.com', username=f'vendor{n}', password='secret') for n in range(2)]
+
+    def post(self, lines, **fields):
+        return self.client.post('/api/orders/', {'payment_method': 'PayPal', 'order_items': lines, **fields}, format='json')
+
+    def test_totals_come_from_the_products(self):
+        first, = make_products(1, vendor=self.vendors[0], shipping=Decimal('1.50'))
+        second, = make_products(1, vendor=self.vendors[1])
+        Product.objects.filter(pk=second.pk).update(price=Decimal('5.05'))
+        response = self.post([{'product': first.id, 'qty': 2}, {'product': second.id}], total='0.01', sub_total='0.01')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        order = Order.objects.get()
+        # 2 x 10.00 + 5.05; tax and fee rounded half up to the cent
+        self.assertEqual(
+            (order.sub_total, order.shipping, order.tax, order.service_fee, order.total),
+            (Decimal('25.05'), Decimal('3.00'), Decimal('2.51'), Decimal('1.25'), Decimal('31.81'))
+        )
+        self.assertEqual(response.data['total'], '31.81')
+        self.assertEqual(
+            sorted(order.orderitem_set.values_list('product_id', 'qty', 'price', 'sub_total', 'vendor_id')),
+            [(first.id, 2, Decimal('10.00'), Decimal('20.00'), self.vendors[0].id), (second.id, 1, Decimal('5.05'), Decimal('5.05'), self.vendors[1].id)]
+        )
+        self.assertEqual(set(order.vendor.values_list('id', flat=True)), {vendor.id for vendor in self.vendors})
+        self.assertEqual(len(response.data['order_items']), 2)
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        counts = []
+        for count in (1, 10):
+            products = [make_products(1, vendor=self.vendors[number % 2])[0] for number in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post([{'product': product.id, 'qty': 1} for product in products])
+            self.assertEqual(response.status_code, 201, response.data)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_rejects_empty_and_unknown_lines(self):
+        self.assertEqual(self.post([]).status_code, 400)
+        response = self.post([{'product': 999999, 'qty': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('order_items', response.data)
+        self.assertFalse(Order.objects.exists())
+
+
+class ReviewEndpointTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        self.product, = make_products(1)
+        self.review = Review.objects.create(user=self.user, product=self.product, review='Great', rating=5, active=True)
+        Review.objects.create(user=self.user, product=self.product, review='Pending', rating=1)
+
+    def test_lists_active_reviews(self):
+        response = APIClient().get('/api/reviews/')
+        self.assertEqual([review['id'] for review in response.data['results']], [self.review.id])
+
+    def test_read_only(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f'/api/reviews/{self.review.id}/'
+        self.assertEqual(client.post('/api/reviews/', {'product': self.product.id, 'rating': 5, 'active': True}).status_code, 405)
+        self.assertEqual(client.patch(url, {'active': False, 'reply': 'Thanks'}).status_code, 405)
+        self.assertEqual(client.delete(url).status_code, 405)
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.active, self.review.reply), (True, None))
+
+
+@skipUnless('replica1' in settings.DATABASES, 'needs a replica1 alias (DATABASE_REPLICA_HOSTS)')
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Database/routers.py over a real replica1 alias.  Replicas mirror the test
+    database, so point one at the primary's own host and run this class on its
+    own (other tests do not allow queries on replica1):
+
+        DATABASE_REPLICA_HOSTS=localhost python manage.py test store.tests.ReplicaRoutingTests
+    """
+    # The runner sets up every alias named here, skipped or not
+    databases = {'default', 'replica1'} if 'replica1' in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        cache.clear()
+        make_products(2)
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {MyTokenObtainPairSerializer.get_token(self.user).access_token}')
+
+    def request(self, method, url, **kwargs):
+        """The response and the number of queries run on default and on replica1"""
+        # A cached catalog response would skip the reads
+        bump_catalog_version()
+        with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections['replica1']) as replica:
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, len(primary), len(replica)
+
+    def test_safe_read_goes_to_replica(self):
+        response, primary, replica = self.request('get', '/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+
+    def test_write_goes_to_primary(self):
+        response, primary, replica = self.request('post', '/api/orders/', data={'total': '10.00'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        self.request('post', '/api/orders/', data={'total': '10.00'}, format='json')
+        response, primary, replica = self.request('get', '/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        # Other clients still read from the replica
+        self.client.credentials()
+        _, primary, replica = self.request('get', '/api/products/')
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+
+
+class ORJSONRendererTests(TestCase):
+    """The orjson renderer against the stock one on real and edge-case payloads"""
+
+    def test_same_bytes_as_stock_renderer(self):
+        user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        order = Order.objects.create(customer=user, total=Decimal('10.00'))
+        for product in make_products(3, Category.objects.create(title='RPG')):
+            OrderItem.objects.create(order=order, product=product, qty=1, price=product.price)
+        payloads = [
+            ProductSerializer(catalog_profile(Product.objects.all()), many=True).data,
+            OrderSerializer(Order.objects.prefetch_related('vendor', 'coupons', order_items_prefetch()), many=True).data,
+            {'big': 2 ** 70, 'nested': [{'big': -(2 ** 65)}], 'price': Decimal('1.50')},
+        ]
+        for data in payloads:
+            self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_decimal_is_rejected(self):
+        for value in (Decimal('NaN'), Decimal('Infinity')):
+            with self.assertRaises(ValueError):
+                ORJSONRenderer().render({'total': value})
+
+
+class FastSerializerParityTests(TestCase):
+    """store/fast_serializers.py builds the same documents as the ModelSerializers it replaces"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        vendor = User.objects.create_user(email='vendor@example.com', username='vendor', password='secret')
+        category = Category.objects.create(title='RPG')
+        self.products = make_products(2, category, vendor=vendor, image='products/cover.jpg')
+        # No category, no image, no regular price
+        self.products += make_products(1)
+        Product.objects.filter(pk=self.products[2].pk).update(regular_price=None)
+        Product.objects.filter(pk=self.products[0].pk).update(rating_avg=Decimal('4.50'), rating_count=2, rating_4_count=1, rating_5_count=1)
+
+        for product in self.products:
+            Cart.objects.create(product=product, user=self.user, qty=2, price=product.price, total=Decimal('21.00'), cart_id='cart-1')
+        Cart.objects.create(product=self.products[0], user=self.user, qty=1)
+
+        self.orders = [Order.objects.create(customer=self.user, total=Decimal('30.00'), payment_id='PAYPAL-1'), Order.objects.create(customer=self.user)]
+        self.orders[0].vendor.add(vendor)
+        key = GameKey.objects.create(product=self.products[0], key='KEY-1', status='sold', order=self.orders[0])
+        OrderItem.objects.create(order=self.orders[0], product=self.products[0], qty=1, price=Decimal('10.00'), game_key=key)
+        OrderItem.objects.create(order=self.orders[0], product=self.products[2], qty=2)
+        self.requests = [APIRequestFactory().get('/api/products/'), None]
+
+    def assertParity(self, fast, model_serializer, queryset):
+        for request in self.requests:
+            with self.subTest(absolute_urls=request is not None):
+                expected = model_serializer(queryset, many=True, context={'request': request}).data
+                self.assertEqual(JSONRenderer().render(fast(request)), JSONRenderer().render(expected))
+
+    def test_products(self):
+        products = catalog_profile(Product.objects.order_by('id'))
+        self.assertParity(lambda request: serialize_products([p.id for p in products], MediaURLs(request)), ProductSerializer, products)
+
+    def test_cart(self):
+        cart = catalog_profile(Cart.objects.order_by('id'), prefix='product__')
+        self.assertParity(lambda request: serialize_cart([c.id for c in cart], MediaURLs(request)), CartSerializer, cart)
+
+    def test_orders(self):
+        orders = Order.objects.order_by('id').prefetch_related('vendor', 'orderitem_set__product', 'orderitem_set__game_key')
+        self.assertParity(lambda request: serialize_orders([o.id for o in orders], MediaURLs(request)), OrderListSerializer, orders)
+
+
+class KeysetPaginationTests(TestCase):
+    def test_values_listing_ordered_by_annotation(self):
+        # search_products orders by an annotated rank before ProductViewSet narrows the rows to .values('id')
+        products = make_products(3)
+        rows = Product.objects.annotate(rank=F('id') % 2).order_by('-rank', '-id').values('id')
+        request = Request(APIRequestFactory().get('/api/products/', {'page_size': 2}))
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(rows, request)
+        expected = sorted(products, key=lambda product: (product.id % 2, product.id), reverse=True)
+        self.assertEqual([row['id'] for row in page], [product.id for product in expected[:2]])
+        request = Request(APIRequestFactory().get(paginator.get_next_link()))
+        self.assertEqual([row['id'] for row in KeysetPagination().paginate_queryset(rows, request)], [expected[2].id])
+
+
+class AsyncCatalogTests(TestCase):
+    """The /api/async/ catalog reads serve the same payloads as their DRF routes"""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(title='RPG')
+        make_products(3, category)
+
+    def test_product_list_pages_like_the_sync_route(self):
+        for query in ('?page_size=2', '?page=2&page_size=2', '?ordering=-rating&page_size=2'):
+            with self.subTest(query=query):
+                sync = self.client.get(f'/api/products/{query}').json()
+                asynchronous = self.client.get(f'/api/async/products/{query}').json()
+                self.assertEqual(asynchronous, {**sync, **{
+                    link: sync[link] and sync[link].replace('/api/products/', '/api/async/products/') for link in ('next', 'previous')
+                }})
+
+        first = self.client.get('/api/async/products/?page_size=2').json()
+        self.assertEqual(list(first), ['count', 'next', 'previous', 'results'])
+        rest = self.client.get(first['next']).json()
+        self.assertEqual([p['id'] for p in first['results'] + rest['results']], list(Product.objects.order_by('-id').values_list('id', flat=True)))
+
+    def test_category_list_pages_like_the_sync_route(self):
+        Category.objects.create(title='Action')
+        for query in ('', '?page_size=1'):
+            with self.subTest(query=query):
+                sync = self.client.get(f'/api/categories/{query}').json()
+                asynchronous = self.client.get(f'/api/async/categories/{query}').json()
+                self.assertEqual(list(sync), ['count', 'next', 'previous', 'results'])
+                self.assertEqual(asynchronous, {**sync, **{
+                    link: sync[link] and sync[link].replace('/api/categories/', '/api/async/categories/') for link in ('next', 'previous')
+                }})
@@ -1,16 +1,25 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
-from .views import CategoryViewSet, ProductViewSet, WishlistViewSet
+from . import views, async_views
+from .views import CategoryViewSet, ProductViewSet, WishlistViewSet, ReviewViewSet
 
 router = DefaultRouter()
 router.register('categories', CategoryViewSet, basename='category')
 router.register('products', ProductViewSet, basename='product')
 router.register('wishlist', WishlistViewSet, basename='wishlist')
+router.register('reviews', ReviewViewSet, basename='review')
 
 urlpatterns = [
-    path('', include(router.urls)),
+    # Must precede the router, whose products/<pk>/ route would swallow it
     path('products/discounted/', views.get_discounted_products, name='discounted-products'),
+    path('catalog/cache-stats/', views.get_catalog_cache_stats, name='catalog-cache-stats'),
+    # Async variants of the hottest reads, for ASGI servers
+    path('async/products/', async_views.product_list, name='async-product-list'),
+    path('async/products/discounted/', async_views.discounted_products, name='async-discounted-products'),
+    path('async/products/<int:pk>/', async_views.product_detail, name='async-product-detail'),
+    path('async/categories/', async_views.category_list, name='async-category-list'),
+    path('async/payments/paypal/webhook/', async_views.paypal_webhook, name='async-paypal-webhook'),
+    path('', include(router.urls)),
     
     path('cart/', views.CartViewSet.as_view({
         'get': 'list',
@@ -53,4 +62,5 @@ urlpatterns = [
     }), name='variant-item-detail'),
     # Add this to your urlpatterns
     path('orders/<str:order_id>/capture/', views.capture_payment, name='capture_payment'),
+    path('orders/<str:order_id>/status/', views.order_payment_status, name='order_payment_status'),
 ]
\ No newline at end of file
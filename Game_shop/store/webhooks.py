@@ -0,0 +1,164 @@
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from utils.paypal import PayPalClient, PayPalError
+from .game_keys import GameKeyAllocator
+from .models import Order, PayPalWebhookEvent
+from .outbox import enqueue_game_key_emails, retry_delay
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+# How long a worker's claim on an event keeps other workers off it
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+class EventRejected(Exception):
+    """The event is well-formed but must not be applied; it is not retried."""
+
+
+def record_event(event):
+    """Store a verified event once; PayPal redeliveries of the same id are no-ops."""
+    return PayPalWebhookEvent.objects.get_or_create(
+        event_id=event['id'],
+        defaults={
+            'event_type': event.get('event_type', ''),
+            'resource_id': event.get('resource', {}).get('id'),
+            'payload': event,
+        }
+    )
+
+
+def _paypal_order_id(resource):
+    # Captures point at their checkout order here; order events are the order itself
+    related_ids = resource.get('supplementary_data', {}).get('related_ids', {})
+    return related_ids.get('order_id') or resource['id']
+
+
+def _already_captured(error):
+    # PayPal answers 422 with issue ORDER_ALREADY_CAPTURED when the order was captured before
+    if error.status_code != 422 or error.response is None:
+        return False
+    try:
+        details = error.response.json().get('details', [])
+    except ValueError:
+        return False
+    return any(detail.get('issue') == 'ORDER_ALREADY_CAPTURED' for detail in details)
+
+
+def handle_order_approved(event):
+    # The buyer approved the payment; capture it server-side.  The capture
+    # result comes back as its own PAYMENT.CAPTURE.COMPLETED event.
+    paypal_order_id = event.payload['resource']['id']
+    order = Order.objects.get(payment_id=paypal_order_id)
+    if order.payment_status != 'Processing':
+        return
+    try:
+        PayPalClient().capture_order(paypal_order_id)
+    except PayPalError as e:
+        if not _already_captured(e):
+            raise
+        logger.info(f"PayPal order {paypal_order_id} was already captured")
+
+
+@transaction.atomic
+def handle_capture_completed(event):
+    resource = event.payload['resource']
+    order = Order.objects.select_for_update(of=('self',)).select_related('customer').get(payment_id=_paypal_order_id(resource))
+    if order.payment_status != 'Paid':
+        amount = Decimal(resource['amount']['value'])
+        currency = resource['amount']['currency_code']
+        if currency != 'USD' or amount != order.total:
+            raise EventRejected(
+                f"Capture {resource['id']} of {amount} {currency} does not match order {order.order_id} total {order.total} USD"
+            )
+        order.payment_status = 'Paid'
+        order.payment_method = 'PayPal'
+
+    # Allocation skips items that already have a key, so a redelivery or an
+    # order marked Paid elsewhere only gets the keys it is still missing
+    assigned, _ = GameKeyAllocator().allocate_order(order)
+    if order.customer:
+        enqueue_game_key_emails(order.customer.email, assigned)
+    order.order_status = 'Fulfilled'
+    order.save()
+
+
+def handle_capture_denied(event):
+    resource = event.payload['resource']
+    Order.objects.filter(payment_id=_paypal_order_id(resource)).exclude(payment_status='Paid').update(payment_status='Failed')
+
+
+HANDLERS = {
+    'CHECKOUT.ORDER.APPROVED': handle_order_approved,
+    'PAYMENT.CAPTURE.COMPLETED': handle_capture_completed,
+    'PAYMENT.CAPTURE.DENIED': handle_capture_denied,
+    'PAYMENT.CAPTURE.DECLINED': handle_capture_denied,
+}
+
+
+def claim_events(batch_size):
+    """
+    Take up to ``batch_size`` due events for this worker.  The claim counts
+    as an attempt and moves ``next_attempt_at`` past CLAIM_TIMEOUT, so other
+    workers skip the events; if this worker dies they come due again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            PayPalWebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('received_at')[:batch_size]
+        )
+        for event in events:
+            event.attempts += 1
+            event.next_attempt_at = now + CLAIM_TIMEOUT
+        PayPalWebhookEvent.objects.bulk_update(events, ['attempts', 'next_attempt_at'])
+    return events
+
+
+def process_event(event):
+    """
+    Apply one claimed event and save its outcome.  Handlers open their own
+    transactions, so the PayPal capture call in handle_order_approved runs
+    without holding row locks.
+    """
+    handler = HANDLERS.get(event.event_type)
+    if handler is None:
+        event.status = 'ignored'
+    else:
+        try:
+            handler(event)
+        except EventRejected as e:
+            logger.error(f"PayPal event {event.event_id} rejected: {e}")
+            event.status = 'failed'
+            event.last_error = str(e)
+        except Exception as e:
+            logger.warning(f"PayPal event {event.event_id} failed (attempt {event.attempts}): {e}")
+            event.last_error = str(e)
+            if event.attempts >= MAX_ATTEMPTS:
+                event.status = 'failed'
+            else:
+                event.next_attempt_at = timezone.now() + retry_delay(event.attempts)
+        else:
+            event.status = 'processed'
+            event.processed_at = timezone.now()
+            event.last_error = None
+    event.save(update_fields=['status', 'next_attempt_at', 'last_error', 'processed_at'])
+
+
+def process_batch(batch_size=100):
+    """
+    Apply up to ``batch_size`` due events, each on its own, so one failure
+    does not undo the rest of the batch.  Returns the number of events
+    looked at.
+    """
+    events = claim_events(batch_size)
+    for event in events:
+        process_event(event)
+    return len(events)
@@ -0,0 +1,130 @@
+"""
+JWT authentication variants that avoid the per-request ``User`` query.
+
+CachedJWTAuthentication (the default) keeps the ``User`` and ``Profile``
+fields listed below in the cache for AUTH_USER_CACHE_TIMEOUT seconds and
+rebuilds the instances from them; the password hash is never cached.
+userauths.signals drops the entry whenever either row is saved or deleted.
+
+StatelessJWTAuthentication is opt-in for read-mostly endpoints: safe methods
+get a ClaimsUser built from the token claims MyTokenObtainPairSerializer
+writes, with no database or cache access; anything else falls back to the
+cached user.  A token issued to an inactive user is rejected, but a user
+deactivated after the token was issued keeps read access on these endpoints
+until the access token expires (ACCESS_TOKEN_LIFETIME); writes and
+CachedJWTAuthentication endpoints refuse them right away.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Profile, User
+
+# What the auth cache keeps: the fields authentication and the views reading
+# request.user need.  Anything else is deferred and loads on first access.
+CACHED_USER_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+CACHED_PROFILE_FIELDS = ('id', 'user_id', 'full_name', 'image', 'bio', 'mobile', 'user_type', 'verified')
+
+
+def get_auth_cache():
+    return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+
+def auth_user_cache_key(user_id):
+    return f'auth:user-fields:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    if user_id:
+        get_auth_cache().delete(auth_user_cache_key(user_id))
+
+
+def _cached_fields(instance, names):
+    fields = [field for field in instance._meta.concrete_fields if field.attname in names]
+    return {
+        'db': instance._state.db,
+        'names': [field.attname for field in fields],
+        'values': [field.get_prep_value(getattr(instance, field.attname)) for field in fields],
+    }
+
+
+def _from_cached_fields(model, entry):
+    return model.from_db(entry['db'], entry['names'], entry['values'])
+
+
+def get_cached_user(user_id):
+    """``User`` with ``profile`` preloaded, or None if there is no such user."""
+    cache = get_auth_cache()
+    key = auth_user_cache_key(user_id)
+    entry = cache.get(key)
+    if entry is None:
+        user = User.objects.select_related('profile').filter(id=user_id).first()
+        if user is None:
+            return None
+        profile = getattr(user, 'profile', None)
+        entry = {
+            'user': _cached_fields(user, CACHED_USER_FIELDS),
+            'profile': profile and _cached_fields(profile, CACHED_PROFILE_FIELDS),
+        }
+        cache.set(key, entry, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+
+    user = _from_cached_fields(User, entry['user'])
+    if entry['profile'] is not None:
+        user.profile = _from_cached_fields(Profile, entry['profile'])
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
+
+
+class ClaimsUser(TokenUser):
+    """Read-only user backed by the access token claims; has no ``profile``."""
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def user_type(self):
+        return self.token.get('user_type', 'Customer')
+
+    @cached_property
+    def full_name(self):
+        return self.token.get('full_name') or self.username
+
+    @cached_property
+    def is_active(self):
+        # Tokens issued before the claim existed were only issued to active users
+        return self.token.get('is_active', True)
+
+
+class StatelessJWTAuthentication(CachedJWTAuthentication):
+    def authenticate(self, request):
+        self.safe_method = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if self.safe_method:
+            user = ClaimsUser(validated_token)
+            if not user.is_active:
+                raise AuthenticationFailed('User is inactive', code='user_inactive')
+            return user
+        return super().get_user(validated_token)
@@ -0,0 +1,10 @@
+from django.core.checks import Tags, register
+
+from utils.checks import shared_cache_warnings
+
+
+@register(Tags.caches, deploy=True)
+def check_token_prune_lock_cache(app_configs, **kwargs):
+    return shared_cache_warnings(
+        'TOKEN_BLACKLIST_PRUNE_CACHE_ALIAS', 'Every `prune_token_blacklist --loop` worker prunes on its own', 'userauths.W001'
+    )
@@ -0,0 +1,80 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from . import counters
+from .models import ChatMessage, User
+from .realtime import push_message, push_read_receipt, user_group
+from .serializers import ChatMessageSerializer
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Support chat socket at ``/ws/chat/?token=<access token>``.
+
+    Client -> server:
+        {"type": "message", "receiver": <user id>, "message": "...", "related_ticket": <id, optional>}
+        {"type": "read", "sender": <user id>}
+    Server -> client:
+        {"type": "message", "message": {...ChatMessageSerializer...}}
+        {"type": "read", "reader": <user id>}
+        {"type": "unread", "unread_count": <chat badge count>}
+        {"type": "error", "detail": "..."}
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.user = user
+        self.group_name = user_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        kind = content.get('type')
+        if kind == 'message':
+            error = await self.create_message(content)
+        elif kind == 'read':
+            error = await self.mark_read(content.get('sender'))
+        else:
+            error = f'Unknown message type: {kind}'
+        if error:
+            await self.send_json({'type': 'error', 'detail': error})
+
+    @database_sync_to_async
+    def create_message(self, content):
+        serializer = ChatMessageSerializer(data={
+            'receiver': content.get('receiver'),
+            'message': content.get('message'),
+            'related_ticket': content.get('related_ticket'),
+        })
+        if not serializer.is_valid():
+            return serializer.errors
+        message = serializer.save(sender=self.user)
+        push_message(ChatMessageSerializer(message).data)
+        return None
+
+    @database_sync_to_async
+    def mark_read(self, sender_id):
+        if not User.objects.filter(id=sender_id).exists():
+            return 'User not found'
+        marked = ChatMessage.objects.filter(sender_id=sender_id, receiver=self.user, is_read=False).update(is_read=True)
+        counters.adjust(self.user.id, counters.CHAT, -marked)
+        push_read_receipt(self.user.id, [sender_id])
+        return None
+
+    # Group event handlers
+
+    async def chat_message(self, event):
+        await self.send_json({'type': 'message', 'message': event['message']})
+
+    async def chat_read(self, event):
+        await self.send_json({'type': 'read', 'reader': event['reader']})
+
+    async def chat_unread(self, event):
+        await self.send_json({'type': 'unread', 'unread_count': event['unread_count']})
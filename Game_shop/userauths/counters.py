@@ -0,0 +1,92 @@
+"""
+Per-user unread counters behind the navbar badges.
+
+Counters live in UnreadCounter and are adjusted on write: the post_save /
+post_delete receivers in userauths.signals cover row-level changes, and the
+bulk ``mark as read`` paths call ``adjust``/``set_count`` themselves because
+queryset.update() sends no signals.  A missing counter is seeded from the
+source table on first use; ``reconcile`` (the reconcile_unread_counters
+command) repairs any drift.
+"""
+from django.apps import apps
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from .models import UnreadCounter
+
+CHAT = 'chat'
+NOTIFICATIONS = 'notifications'
+VENDOR_NOTIFICATIONS = 'vendor_notifications'
+
+# kind -> (model label, owner user id lookup, "unread" filter)
+SOURCES = {
+    CHAT: ('userauths.ChatMessage', 'receiver_id', {'is_read': False}),
+    NOTIFICATIONS: ('customer.Notifications', 'user_id', {'seen': False}),
+    VENDOR_NOTIFICATIONS: ('vendor.Notification', 'user__user_id', {'seen': False}),
+}
+
+
+def unread_queryset(kind):
+    label, _, unread = SOURCES[kind]
+    return apps.get_model(label).objects.filter(**unread)
+
+
+def recount(user_id, kind):
+    """Recompute one counter from the source table and store it."""
+    _, owner, _ = SOURCES[kind]
+    count = unread_queryset(kind).filter(**{owner: user_id}).count()
+    set_count(user_id, kind, count)
+    return count
+
+
+def set_count(user_id, kind, count):
+    UnreadCounter.objects.update_or_create(user_id=user_id, kind=kind, defaults={'count': count})
+
+
+def adjust(user_id, kind, delta):
+    """Add ``delta`` to a counter; never goes below zero."""
+    if not user_id or not delta:
+        return
+    updated = UnreadCounter.objects.filter(user_id=user_id, kind=kind).update(
+        count=Greatest(F('count') + delta, Value(0))
+    )
+    # Nothing to decrement yet: the counter is seeded on first read.  Seeding
+    # here on a decrement could also resurrect a counter for a user whose
+    # rows are being cascade-deleted.
+    if not updated and delta > 0:
+        recount(user_id, kind)
+
+
+def get_count(user_id, kind):
+    count = UnreadCounter.objects.filter(user_id=user_id, kind=kind).values_list('count', flat=True).first()
+    if count is None:
+        count = recount(user_id, kind)
+    return count
+
+
+def get_counts(user_id):
+    """All badge counters for a user in one lookup: ``{kind: count}``."""
+    counts = dict(UnreadCounter.objects.filter(user_id=user_id).values_list('kind', 'count'))
+    for kind in SOURCES:
+        if kind not in counts:
+            counts[kind] = recount(user_id, kind)
+    return counts
+
+
+def reconcile(kind):
+    """Bring every stored counter of ``kind`` in line with the source table; returns how many changed."""
+    _, owner, _ = SOURCES[kind]
+    actual = {
+        row[owner]: row['n']
+        for row in unread_queryset(kind).exclude(**{f'{owner}__isnull': True})
+        .values(owner).annotate(n=Count('id')).order_by()
+    }
+    stored = dict(UnreadCounter.objects.filter(kind=kind).values_list('user_id', 'count'))
+
+    repaired = 0
+    for user_id in set(actual) | set(stored):
+        expected = actual.get(user_id, 0)
+        if stored.get(user_id) != expected:
+            set_count(user_id, kind, expected)
+            repaired += 1
+    return repaired
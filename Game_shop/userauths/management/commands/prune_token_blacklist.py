@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from userauths.tokens import prune_expired_tokens, prune_once_per_interval
+
+
+class Command(BaseCommand):
+    help = 'Delete expired simplejwt outstanding tokens and their blacklist entries in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+        parser.add_argument('--loop', action='store_true', help='Keep pruning every --interval seconds instead of exiting')
+        parser.add_argument(
+            '--interval', type=float, default=settings.TOKEN_BLACKLIST_PRUNE_INTERVAL,
+            help='Seconds between prunes with --loop (default: TOKEN_BLACKLIST_PRUNE_INTERVAL)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.report(prune_expired_tokens(options['batch_size'], options['max_batches']))
+            return
+
+        interval = options['interval']
+        while True:
+            try:
+                # Other --loop workers sharing the cache skip the rounds this one takes
+                reclaimed = prune_once_per_interval(int(interval), options['batch_size'])
+            except Exception as e:
+                self.stderr.write(f'Token pruning failed: {e}')
+                close_old_connections()
+            else:
+                if reclaimed is not None:
+                    self.report(reclaimed)
+            time.sleep(interval)
+
+    def report(self, reclaimed):
+        self.stdout.write(self.style.SUCCESS(
+            f"Reclaimed {reclaimed['outstanding']} outstanding and {reclaimed['blacklisted']} blacklisted tokens"
+        ))
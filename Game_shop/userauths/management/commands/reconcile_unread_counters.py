@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from userauths import counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute unread badge counters from the message and notification tables and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(counters.SOURCES), help='Only reconcile one counter kind')
+
+    def handle(self, *args, **options):
+        kinds = [options['kind']] if options['kind'] else list(counters.SOURCES)
+        for kind in kinds:
+            repaired = counters.reconcile(kind)
+            self.stdout.write(self.style.SUCCESS(f'{kind}: repaired {repaired} counters'))
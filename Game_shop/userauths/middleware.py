@@ -0,0 +1,37 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import get_cached_user
+
+
+@database_sync_to_async
+def get_user_for_token(raw_token):
+    try:
+        token = AccessToken(raw_token)
+        user = get_cached_user(token['user_id'])
+    except (TokenError, KeyError):
+        return AnonymousUser()
+    if user is None or not user.is_active:
+        return AnonymousUser()
+    return user
+
+
+class JWTAuthMiddleware:
+    """
+    Authenticate WebSocket connections with the same access token the REST
+    API uses.  Browsers cannot set headers on a WebSocket handshake, so the
+    token is read from the ``?token=`` query parameter.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        raw_token = query.get('token', [None])[0]
+        scope['user'] = await get_user_for_token(raw_token) if raw_token else AnonymousUser()
+        return await self.app(scope, receive, send)
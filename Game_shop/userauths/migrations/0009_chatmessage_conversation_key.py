@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 18:17
+
+from django.db import migrations, models
+
+
+BACKFILL_CONVERSATION_KEY = """
+UPDATE userauths_chatmessage
+SET conversation_key = LEAST(sender_id, receiver_id) || ':' || GREATEST(sender_id, receiver_id);
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userauths', '0008_chatmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='conversation_key',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.RunSQL(BACKFILL_CONVERSATION_KEY, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['conversation_key', 'id'], name='chatmessage_conversation_idx'),
+        ),
+    ]
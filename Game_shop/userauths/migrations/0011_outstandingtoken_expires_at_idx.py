@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('userauths', '0010_unreadcounter'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        # The refresh-time lookups go through the unique jti and token_id
+        # indexes simplejwt already creates; pruning needs expires_at.
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS token_blacklist_outstandingtoken_expires_idx '
+            'ON token_blacklist_outstandingtoken (expires_at);',
+            'DROP INDEX CONCURRENTLY IF EXISTS token_blacklist_outstandingtoken_expires_idx;',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userauths', '0011_outstandingtoken_expires_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supportrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='supportrequest_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportrequest',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='supportrequest_user_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.db.models.signals import post_save
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
@@ -24,7 +24,12 @@ class User(AbstractUser):
         email_username, _ = self.email.split("@")
         if not self.username:
             self.username = email_username
-        super(User, self).save(*args, **kwargs)
+        if self._state.adding:
+            # create_user_profile (post_save) создаёт профиль в этой же транзакции
+            with transaction.atomic():
+                super(User, self).save(*args, **kwargs)
+        else:
+            super(User, self).save(*args, **kwargs)
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -42,20 +47,17 @@ class Profile(models.Model):
     def save(self, *args, **kwargs):
         if not self.full_name:
             self.full_name = self.user.username
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'full_name'}
         super(Profile, self).save(*args, **kwargs)
 
 
-@receiver(post_save, sender=User)
+@receiver(post_save, sender=User, dispatch_uid='create_user_profile')
 def create_user_profile(sender, instance, created, **kwargs):
+    # Профиль создаётся один раз; дальнейшие сохранения User его не трогают
     if created:
         Profile.objects.create(user=instance)
 
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
-
-post_save.connect(create_user_profile, sender=User)
-post_save.connect(save_user_profile, sender=User)
-
 class SupportRequest(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -76,6 +78,11 @@ class SupportRequest(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Support Request'
         verbose_name_plural = 'Support Requests'
+        indexes = [
+            # Keyset pages of the ticket lists: all tickets, and one user's, newest first
+            models.Index(fields=['-created_at', '-id'], name='supportrequest_created_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='supportrequest_user_idx'),
+        ]
 
     def __str__(self):
         return f"{self.subject} - {self.user_email}"
@@ -87,9 +94,45 @@ class ChatMessage(models.Model):
     related_ticket = models.ForeignKey('SupportRequest', on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+    # "<меньший id>:<больший id>" — вся переписка пары пользователей по одному индексу
+    conversation_key = models.CharField(max_length=64, editable=False, default='')
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation_key', 'id'], name='chatmessage_conversation_idx'),
+            models.Index(fields=['receiver'], name='chatmessage_unread_idx', condition=models.Q(is_read=False)),
+        ]
+
+    def __str__(self):
+        return f'Message from {self.sender.username} to {self.receiver.username}'
+
+    @staticmethod
+    def conversation_key_for(user_a_id, user_b_id):
+        low, high = sorted((int(user_a_id), int(user_b_id)))
+        return f'{low}:{high}'
+
+    def save(self, *args, **kwargs):
+        self.conversation_key = self.conversation_key_for(self.sender_id, self.receiver_id)
+        super(ChatMessage, self).save(*args, **kwargs)
+
+class UnreadCounter(models.Model):
+    """Счётчик непрочитанного для бейджей навбара, см. userauths.counters"""
+    KIND_CHOICES = (
+        ('chat', 'Chat messages'),
+        ('notifications', 'Notifications'),
+        ('vendor_notifications', 'Vendor notifications'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='unread_counters')
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind'], name='unreadcounter_unique_user_kind'),
+        ]
 
     def __str__(self):
-        return f'Message from {self.sender.username} to {self.receiver.username}'
\ No newline at end of file
+        return f'{self.user} {self.kind}: {self.count}'
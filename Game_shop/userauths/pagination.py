@@ -0,0 +1,70 @@
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class MessageWindowPagination(BasePagination):
+    """
+    Keyset window over a conversation, returned oldest-first.
+
+    No parameters: the latest ``page_size`` messages.
+    ``?before=<id>``: the ``page_size`` messages preceding that message.
+    ``?after=<id>``: the ``page_size`` messages following it (catch-up after reconnect).
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def _cursor(request, name):
+        try:
+            return int(request.query_params[name])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        before = self._cursor(request, 'before')
+        after = self._cursor(request, 'after')
+
+        if after is not None:
+            rows = list(queryset.filter(id__gt=after).order_by('id')[:size + 1])
+            self.has_newer = len(rows) > size
+            rows = rows[:size]
+            self.has_older = True
+        else:
+            if before is not None:
+                queryset = queryset.filter(id__lt=before)
+            rows = list(queryset.order_by('-id')[:size + 1])
+            self.has_older = len(rows) > size
+            rows = rows[:size][::-1]
+            self.has_newer = before is not None
+
+        self.page = rows
+        return rows
+
+    def _link(self, name, value):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'before' if name == 'after' else 'after')
+        return replace_query_param(url, name, value)
+
+    def get_paginated_response(self, data):
+        previous = next_ = None
+        if self.page:
+            if self.has_older:
+                previous = self._link('before', self.page[0].id)
+            if self.has_newer:
+                next_ = self._link('after', self.page[-1].id)
+        return Response({
+            'previous': previous,
+            'next': next_,
+            'results': data,
+        })
@@ -0,0 +1,49 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from . import counters
+
+
+def user_group(user_id):
+    return f'chat_user_{user_id}'
+
+
+def push_to_users(user_ids, event):
+    """
+    Send ``event`` to every open chat socket of ``user_ids`` once the
+    current transaction commits.  ``event['type']`` names the consumer
+    handler (see userauths.consumers.ChatConsumer).
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    def send():
+        for user_id in set(user_ids):
+            async_to_sync(channel_layer.group_send)(user_group(user_id), event)
+
+    transaction.on_commit(send)
+
+
+def push_unread_count(user_id):
+    """Send ``user_id`` their chat badge count, read from the unread counter."""
+    push_to_users([user_id], {'type': 'chat.unread', 'unread_count': counters.get_count(user_id, counters.CHAT)})
+
+
+def push_message(message_data):
+    """Deliver a serialized ChatMessage to its sender and receiver."""
+    push_to_users(
+        [message_data['sender'], message_data['receiver']],
+        {'type': 'chat.message', 'message': message_data}
+    )
+    push_unread_count(message_data['receiver'])
+
+
+def push_read_receipt(reader_id, sender_ids):
+    """Tell each sender that ``reader_id`` has read their messages."""
+    push_to_users(
+        list(sender_ids) + [reader_id],
+        {'type': 'chat.read', 'reader': reader_id}
+    )
+    push_unread_count(reader_id)
@@ -28,6 +28,7 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['verified'] = user.profile.verified
         token['is_staff'] = user.is_staff
         token['is_superuser'] = user.is_superuser
+        token['is_active'] = user.is_active
         token['user_id'] = user.id
 
         return token
@@ -47,13 +48,11 @@ class RegisterSerializer(serializers.ModelSerializer):
             )
         return attrs
     def create(self, validated_data):
-        user = User.objects.create_user(
+        return User.objects.create_user(
             username=validated_data['username'],
-            email=validated_data['email']
+            email=validated_data['email'],
+            password=validated_data['password']
         )
-        user.set_password(validated_data['password'])
-        user.save()
-        return user
 
 class PayPalOrderSerializer(serializers.ModelSerializer):
     order_items = serializers.SerializerMethodField()
@@ -85,15 +84,9 @@ class PayPalOrderSerializer(serializers.ModelSerializer):
             order.customer = request.user
             order.save()
             print(f"Fixed customer field for order {order.id} to user {request.user.username}")
-            
-        # Initialize payment process
-        try:
-            from store.views import get_paypal_accsess_token
-            # Store the payment ID instead of a URL that doesn't exist in the model
-            order.payment_id = get_paypal_accsess_token()
-            order.save()
-        except Exception as e:
-            print(f"PayPal initialization error: {str(e)}")
+
+        # payment_id is the PayPal order id, filled in when the buyer's PayPal
+        # order is captured; webhooks and captures look the order up by it
         return order
 
 class SupportRequestSerializer(serializers.ModelSerializer):
@@ -0,0 +1,69 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from customer.models import Notifications
+from vendor.models import Notification, Vendor
+
+from . import counters
+from .authentication import invalidate_cached_user
+from .models import ChatMessage, Profile, User
+
+
+@receiver(post_save, sender=User, dispatch_uid='auth_cache_user_save')
+@receiver(post_delete, sender=User, dispatch_uid='auth_cache_user_delete')
+def drop_cached_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=Profile, dispatch_uid='auth_cache_profile_save')
+@receiver(post_delete, sender=Profile, dispatch_uid='auth_cache_profile_delete')
+def drop_cached_profile_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id)
+
+
+def _track(kind, owner_id, is_unread, created):
+    if created:
+        if is_unread:
+            counters.adjust(owner_id, kind, 1)
+    elif owner_id:
+        # Read-state edits through the API are rare; recount rather than diff
+        counters.recount(owner_id, kind)
+
+
+def _vendor_user_id(notification):
+    if notification.user_id is None:
+        return None
+    return Vendor.objects.filter(pk=notification.user_id).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=ChatMessage, dispatch_uid='unread_chat_save')
+def chat_message_saved(sender, instance, created, **kwargs):
+    _track(counters.CHAT, instance.receiver_id, not instance.is_read, created)
+
+
+@receiver(post_delete, sender=ChatMessage, dispatch_uid='unread_chat_delete')
+def chat_message_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        counters.adjust(instance.receiver_id, counters.CHAT, -1)
+
+
+@receiver(post_save, sender=Notifications, dispatch_uid='unread_notifications_save')
+def notification_saved(sender, instance, created, **kwargs):
+    _track(counters.NOTIFICATIONS, instance.user_id, not instance.seen, created)
+
+
+@receiver(post_delete, sender=Notifications, dispatch_uid='unread_notifications_delete')
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.seen:
+        counters.adjust(instance.user_id, counters.NOTIFICATIONS, -1)
+
+
+@receiver(post_save, sender=Notification, dispatch_uid='unread_vendor_notifications_save')
+def vendor_notification_saved(sender, instance, created, **kwargs):
+    _track(counters.VENDOR_NOTIFICATIONS, _vendor_user_id(instance), not instance.seen, created)
+
+
+@receiver(post_delete, sender=Notification, dispatch_uid='unread_vendor_notifications_delete')
+def vendor_notification_deleted(sender, instance, **kwargs):
+    if not instance.seen:
+        counters.adjust(_vendor_user_id(instance), counters.VENDOR_NOTIFICATIONS, -1)
@@ -1,3 +1,209 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from . import counters, tokens
+from .authentication import (
+    CachedJWTAuthentication, StatelessJWTAuthentication, auth_user_cache_key, get_auth_cache, get_cached_user
+)
+from .middleware import JWTAuthMiddleware
+from .models import ChatMessage, User
+from .routing import websocket_urlpatterns
+from .serializers import MyTokenObtainPairSerializer
+
+
+class ChatUnreadCountTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', username='admin', password='secret')
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def send(self, count=1):
+        for _ in range(count):
+            ChatMessage.objects.create(sender=self.admin, receiver=self.user, message='Hello')
+
+    def unread_count(self):
+        return self.client.get('/api/api/chat/unread_count/').data['unread_count']
+
+    def test_mark_as_read(self):
+        self.send(3)
+        self.assertEqual(self.unread_count(), 3)
+        self.client.post('/api/api/chat/mark_as_read/')
+        self.assertEqual(self.unread_count(), 0)
+        self.send()
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_message_arriving_during_mark_as_read_stays_unread(self):
+        self.send(2)
+        self.assertEqual(self.unread_count(), 2)
+        update = QuerySet.update
+
+        def update_then_receive(queryset, **kwargs):
+            rows = update(queryset, **kwargs)
+            if queryset.model is ChatMessage:
+                self.send()
+            return rows
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_then_receive):
+            self.client.post('/api/api/chat/mark_as_read/')
+        self.assertEqual(self.unread_count(), 1)
+        self.assertEqual(counters.recount(self.user.id, counters.CHAT), 1)
+
+
+class JWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        get_auth_cache().clear()
+        self.user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+
+    def authenticate(self, authentication, method='get'):
+        access = str(MyTokenObtainPairSerializer.get_token(self.user).access_token)
+        request = getattr(APIRequestFactory(), method)('/api/products/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        return authentication().authenticate(request)[0]
+
+    def test_cache_keeps_fields_not_the_password_hash(self):
+        get_cached_user(self.user.id)
+        entry = get_auth_cache().get(auth_user_cache_key(self.user.id))
+        self.assertNotIn(self.user.password, entry['user']['values'])
+        self.assertNotIn('password', entry['user']['names'])
+
+        with self.assertNumQueries(0):
+            user = get_cached_user(self.user.id)
+            self.assertEqual((user.pk, user.email, user.is_active), (self.user.pk, 'buyer@example.com', True))
+            self.assertEqual(user.profile.user_type, 'Customer')
+        # Fields left out of the cache load on demand
+        self.assertTrue(user.check_password('secret'))
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.authenticate(CachedJWTAuthentication).pk, self.user.pk)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(CachedJWTAuthentication)
+        # Reads on stateless endpoints check the is_active claim
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(StatelessJWTAuthentication)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(StatelessJWTAuthentication, method='post')
+
+
+class ChatSocketBadgeTests(TransactionTestCase):
+    """ws/chat/ pushes the counter-backed unread badge to the reader"""
+
+    def setUp(self):
+        self.sender = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        self.receiver = User.objects.create_user(email='support@example.com', username='support', password='secret')
+        self.tokens = {user.id: str(MyTokenObtainPairSerializer.get_token(user).access_token) for user in (self.sender, self.receiver)}
+
+    def connect(self, user):
+        access = self.tokens[user.id]
+        return WebsocketCommunicator(JWTAuthMiddleware(URLRouter(websocket_urlpatterns)), f'/ws/chat/?token={access}')
+
+    async def receive(self, socket, kind):
+        while True:
+            event = await socket.receive_json_from(timeout=5)
+            if event['type'] == kind:
+                return event
+
+    async def test_badge_follows_messages_and_reads(self):
+        sender, receiver = self.connect(self.sender), self.connect(self.receiver)
+        self.assertTrue((await sender.connect())[0])
+        self.assertTrue((await receiver.connect())[0])
+
+        for count in (1, 2):
+            await sender.send_json_to({'type': 'message', 'receiver': self.receiver.id, 'message': f'Hello {count}'})
+            self.assertEqual((await self.receive(receiver, 'message'))['message']['message'], f'Hello {count}')
+            self.assertEqual(await self.receive(receiver, 'unread'), {'type': 'unread', 'unread_count': count})
+
+        await receiver.send_json_to({'type': 'read', 'sender': self.sender.id})
+        self.assertEqual(await self.receive(receiver, 'unread'), {'type': 'unread', 'unread_count': 0})
+        self.assertEqual(await self.receive(sender, 'read'), {'type': 'read', 'reader': self.receiver.id})
+
+        # The REST mark_as_read route pushes the decrement too
+        await sender.send_json_to({'type': 'message', 'receiver': self.receiver.id, 'message': 'Hello again'})
+        self.assertEqual(await self.receive(receiver, 'unread'), {'type': 'unread', 'unread_count': 1})
+        client = APIClient()
+        client.force_authenticate(self.receiver)
+        await sync_to_async(client.post)('/api/api/chat/mark_as_read/')
+        self.assertEqual(await self.receive(receiver, 'unread'), {'type': 'unread', 'unread_count': 0})
+
+        await sender.disconnect()
+        await receiver.disconnect()
+
+
+class ProfileWriteQueryCountTests(TestCase):
+    """Registration, login and profile saves write the Profile row at most once"""
+
+    def profile_writes(self, queries):
+        return [query['sql'] for query in queries if query['sql'].startswith(('INSERT INTO "userauths_profile"', 'UPDATE "userauths_profile"'))]
+
+    def test_register(self):
+        data = {'email': 'new@example.com', 'username': 'new', 'password': 'Sup3r-secret!', 'password2': 'Sup3r-secret!'}
+        # Two uniqueness checks, then user and profile INSERTs in one savepoint
+        with self.assertNumQueries(6) as queries:
+            response = APIClient().post('/api/register/', data, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(self.profile_writes(queries)), 1)
+
+    def test_login(self):
+        user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        # User, outstanding refresh token, profile claims for the access token
+        with self.assertNumQueries(3) as queries:
+            response = APIClient().post('/api/token/', {'email': 'buyer@example.com', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.profile_writes(queries), [])
+
+        # last_login no longer rewrites the profile
+        with self.assertNumQueries(1):
+            update_last_login(None, user)
+
+    def test_profile_update_writes_changed_fields_only(self):
+        user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        client = APIClient()
+        client.force_authenticate(User.objects.select_related('profile').get(pk=user.pk))
+        with CaptureQueriesContext(connection) as queries:
+            client.put('/api/profile/update/', {'full_name': user.profile.full_name}, format='json')
+        self.assertEqual(self.profile_writes(queries), [])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.put('/api/profile/update/', {'full_name': 'New Name', 'bio': user.profile.bio}, format='json')
+        self.assertEqual(response.data['full_name'], 'New Name')
+        writes = self.profile_writes(queries)
+        self.assertEqual(len(writes), 1)
+        self.assertIn('"full_name"', writes[0])
+        self.assertNotIn('"bio"', writes[0])
+
+
+class TokenPruneTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(email='buyer@example.com', username='buyer', password='secret')
+        now = aware_utcnow()
+        for number, expires_at in enumerate([now - timedelta(days=1)] * 3 + [now + timedelta(days=1)]):
+            token = OutstandingToken.objects.create(user=user, jti=f'jti-{number}', token='token', expires_at=expires_at)
+            BlacklistedToken.objects.create(token=token)
+
+    def test_prune_expired_tokens(self):
+        self.assertEqual(tokens.prune_expired_tokens(batch_size=2), {'outstanding': 3, 'blacklisted': 3})
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+
+    def test_one_prune_per_interval(self):
+        self.assertEqual(tokens.prune_once_per_interval(60), {'outstanding': 3, 'blacklisted': 3})
+        # Another worker sharing the cache skips the rest of the interval
+        self.assertIsNone(tokens.prune_once_per_interval(60))
@@ -0,0 +1,52 @@
+"""
+Pruning for the simplejwt token blacklist tables.
+
+With ROTATE_REFRESH_TOKENS and BLACKLIST_AFTER_ROTATION every refresh adds an
+OutstandingToken and a BlacklistedToken row.  Once a refresh token has expired
+neither row can matter again, so both are deleted here in bounded batches
+(``manage.py prune_token_blacklist``, from cron or as a ``--loop`` worker).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+PRUNE_LOCK_KEY = 'tokens:prune-lock'
+
+
+def prune_expired_tokens(batch_size=5000, max_batches=None):
+    """
+    Delete expired outstanding tokens and their blacklist entries, ``batch_size``
+    rows per transaction.  Returns ``{'outstanding': n, 'blacklisted': m}``.
+    """
+    now = aware_utcnow()
+    reclaimed = {'outstanding': 0, 'blacklisted': 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            # Blacklist rows first, so the outstanding delete has nothing left to cascade to
+            blacklisted, _ = BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            outstanding, _ = OutstandingToken.objects.filter(id__in=ids).delete()
+        reclaimed['blacklisted'] += blacklisted
+        reclaimed['outstanding'] += outstanding
+        batches += 1
+    return reclaimed
+
+
+def prune_once_per_interval(interval, batch_size=5000):
+    """
+    Prune unless another worker already did within ``interval`` seconds, as
+    recorded in TOKEN_BLACKLIST_PRUNE_CACHE_ALIAS.  Returns the reclaimed
+    counts, or None if this round was skipped.
+    """
+    if not caches[settings.TOKEN_BLACKLIST_PRUNE_CACHE_ALIAS].add(PRUNE_LOCK_KEY, True, timeout=interval):
+        return None
+    return prune_expired_tokens(batch_size)
@@ -16,6 +16,7 @@ urlpatterns = [
     path('' , views.getRoutes ),
     path('profile/' , views.get_profile , name= 'profile' ),
     path('profile/update/' , views.update_profile , name= 'profile_update' ),
+    path('badges/', views.unread_badges, name='unread-badges'),
     path('support/tickets/', views.support_tickets_list, name='support-tickets-list'),
     path('support/my-tickets/', views.user_tickets, name='user-tickets'),
     path('support/create/', views.create_support_ticket, name='create-support-ticket'),
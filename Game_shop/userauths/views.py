@@ -1,7 +1,7 @@
 from django.shortcuts import render
 from userauths.models import Profile, User
 from userauths.serializers import UserSerializer, MyTokenObtainPairSerializer, RegisterSerializer
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, permission_classes, action, authentication_classes
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework import generics, status, viewsets
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
@@ -10,6 +10,11 @@ from django.http import JsonResponse
 from .models import Profile, SupportRequest, ChatMessage
 from .serializers import UserSerializer, SupportRequestSerializer, SupportRequestReplySerializer, SupportTicketSerializer, SupportTicketListSerializer, ChatMessageSerializer
 from django.db import models
+from .realtime import push_message, push_read_receipt
+from .pagination import MessageWindowPagination
+from utils.pagination import KeysetPagination
+from . import counters
+from .authentication import StatelessJWTAuthentication
 
 def testEndPoint(request):
     return JsonResponse({'message': 'Test successful'})
@@ -63,19 +68,19 @@ def get_profile(request):
 @permission_classes([IsAuthenticated])
 def update_profile(request):
     profile = request.user.profile
-    
-    if 'full_name' in request.data:
-        profile.full_name = request.data['full_name']
-    if 'bio' in request.data:
-        profile.bio = request.data['bio']
-    if 'mobile' in request.data:
-        profile.mobile = request.data['mobile']
-    if 'user_type' in request.data:
-        profile.user_type = request.data['user_type']
+    changed = []
+
+    for field in ('full_name', 'bio', 'mobile', 'user_type'):
+        if field in request.data and request.data[field] != getattr(profile, field):
+            setattr(profile, field, request.data[field])
+            changed.append(field)
     if 'image' in request.FILES:
         profile.image = request.FILES['image']
-    
-    profile.save()
+        changed.append('image')
+
+    # Пишем только изменившиеся поля, и только если они есть
+    if changed:
+        profile.save(update_fields=changed)
     
     data = {
         'username': request.user.username,
@@ -89,6 +94,15 @@ def update_profile(request):
     }
     return Response(data)
 
+@api_view(['GET'])
+@authentication_classes([StatelessJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def unread_badges(request):
+    """
+    Все счётчики непрочитанного для навбара одним запросом
+    """
+    return Response(counters.get_counts(request.user.id))
+
 class SupportRequestViewSet(viewsets.ModelViewSet):
     serializer_class = SupportRequestSerializer
     permission_classes = [IsAuthenticated]
@@ -170,8 +184,10 @@ def user_tickets(request):
         # Если обычный пользователь, показываем только его тикеты
         tickets = SupportRequest.objects.filter(user=request.user).order_by('-created_at')
     
-    serializer = SupportTicketSerializer(tickets, many=True)
-    return Response(serializer.data)
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(tickets, request)
+    serializer = SupportTicketSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -189,9 +205,10 @@ def ticket_detail(request, ticket_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminUser])
 def user_list(request):
-    users = User.objects.all()
-    serializer = UserSerializer(users, many=True)
-    return Response(serializer.data)
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(User.objects.all(), request)
+    serializer = UserSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminUser])
@@ -199,10 +216,11 @@ def support_tickets_list(request):
     """
     Получение всех тикетов поддержки (только для админов)
     """
-    tickets = SupportRequest.objects.all().order_by('-created_at')
-    serializer = SupportRequestSerializer(tickets, many=True)
-    print("Returning tickets:", serializer.data)  # Добавим для отладки
-    return Response(serializer.data)
+    tickets = SupportRequest.objects.select_related('user').order_by('-created_at')
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(tickets, request)
+    serializer = SupportRequestSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsAdminUser])
@@ -224,57 +242,60 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
         user = self.request.user
         return ChatMessage.objects.filter(
             models.Q(sender=user) | models.Q(receiver=user)
-        ).order_by('created_at')
+        ).select_related('sender', 'receiver').order_by('created_at')
+
+    def conversation_response(self, request, other_user_id):
+        """Окно переписки с ``other_user_id`` (см. MessageWindowPagination)"""
+        messages = ChatMessage.objects.filter(
+            conversation_key=ChatMessage.conversation_key_for(request.user.id, other_user_id)
+        ).select_related('sender', 'receiver')
+        paginator = MessageWindowPagination()
+        page = paginator.paginate_queryset(messages, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def perform_create(self, serializer):
         serializer.save(sender=self.request.user)
+        # Доставляем сообщение открытым WebSocket-соединениям обоих участников
+        push_message(serializer.data)
 
-    @action(detail=False, methods=['GET'])
+    @action(detail=False, methods=['GET'], authentication_classes=[StatelessJWTAuthentication])
     def unread_count(self, request):
-        count = ChatMessage.objects.filter(
-            receiver=request.user,
-            is_read=False
-        ).count()
-        return Response({'unread_count': count})
+        return Response({'unread_count': counters.get_count(request.user.id, counters.CHAT)})
 
     @action(detail=False, methods=['POST'])
     def mark_as_read(self, request):
-        ChatMessage.objects.filter(
+        unread = ChatMessage.objects.filter(
             receiver=request.user,
             is_read=False
-        ).update(is_read=True)
+        )
+        sender_ids = set(unread.values_list('sender_id', flat=True))
+        marked = unread.update(is_read=True)
+        # update() не отправляет сигналы — уменьшаем счётчик на число отмеченных
+        # строк: сообщение, пришедшее после update(), остаётся непрочитанным
+        counters.adjust(request.user.id, counters.CHAT, -marked)
+        if sender_ids:
+            push_read_receipt(request.user.id, sender_ids)
         return Response({'status': 'messages marked as read'})
 
     @action(detail=False, methods=['GET'])
     def admin_chat(self, request):
-        admin = User.objects.filter(is_superuser=True).first()
+        admin = User.objects.filter(is_superuser=True).only('id').first()
         if not admin:
             return Response(
                 {'error': 'No admin found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
-        messages = ChatMessage.objects.filter(
-            (models.Q(sender=request.user) & models.Q(receiver=admin)) |
-            (models.Q(sender=admin) & models.Q(receiver=request.user))
-        ).order_by('created_at')
-        serializer = self.get_serializer(messages, many=True)
-        return Response(serializer.data)
+        return self.conversation_response(request, admin.id)
 
     @action(detail=False, methods=['GET'])
     def messages(self, request, user_id=None):
         """
         Получение сообщений чата с конкретным пользователем
         """
-        try:
-            other_user = User.objects.get(id=user_id)
-            messages = ChatMessage.objects.filter(
-                (models.Q(sender=request.user) & models.Q(receiver=other_user)) |
-                (models.Q(sender=other_user) & models.Q(receiver=request.user))
-            ).order_by('created_at')
-            serializer = self.get_serializer(messages, many=True)
-            return Response(serializer.data)
-        except User.DoesNotExist:
+        if user_id is None or not User.objects.filter(id=user_id).exists():
             return Response(
                 {'error': 'User not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        return self.conversation_response(request, user_id)
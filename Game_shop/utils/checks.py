@@ -0,0 +1,23 @@
+"""
+Deploy checks shared by the apps (``manage.py check --deploy``).
+"""
+from django.conf import settings
+from django.core.checks import Warning
+
+# Backends that keep entries inside one process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache_warnings(setting, consequence, id):
+    """A warning if the cache alias named by ``setting`` is not shared between processes"""
+    alias = getattr(settings, setting)
+    if settings.CACHES.get(alias, {}).get('BACKEND') not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f"{setting} '{alias}' is a per-process cache.",
+        hint=f"{consequence}; point it at a shared cache such as Redis (REDIS_URL).",
+        id=id,
+    )]
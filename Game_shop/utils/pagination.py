@@ -0,0 +1,102 @@
+"""
+Project-wide pagination.
+
+Listings are paged with a keyset cursor (``?cursor=``) over a stable
+ordering that ends in the primary key, so a deep page costs the same
+indexed range scan as the first one and no OFFSET is involved.
+
+The ordering is, in this order of preference: the view's
+``cursor_ordering``; the queryset's explicit ``order_by()`` (search rank,
+OrderingFilter, ...); the paginator's ``ordering``.
+
+Query parameters:
+
+* ``page_size`` - up to ``max_page_size``.
+* ``count=false`` / ``count=true`` - skip or add the COUNT(*) of the whole
+  listing; the default is the paginator's ``include_count``.
+* ``page=N`` - compatibility mode for clients that still page by number
+  (the React ``Paginator``): offset pagination over the same ordering, with
+  ``count``, ``current_page`` and ``total_pages``.
+"""
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class PageNumberCompatPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('current_page', self.page.number),
+            ('total_pages', self.page.paginator.num_pages),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class KeysetPagination(CursorPagination):
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+    include_count = True
+    compat_pagination_class = PageNumberCompatPagination
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering is None and queryset.query.order_by and all(isinstance(field, str) for field in queryset.query.order_by):
+            ordering = queryset.query.order_by
+        ordering = ordering or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = tuple(ordering)
+        # The primary key makes rows with equal sort keys come back in a fixed order
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+    def wants_count(self, request):
+        value = request.query_params.get(self.count_query_param)
+        if value is None:
+            return self.include_count
+        return value.lower() not in ('0', 'false', 'no', 'off')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        self.compat = None
+        ordering = self.get_ordering(request, queryset, view)
+        if queryset.query.values_select:
+            # .values() listings (store/fast_serializers.py): the cursor is read from the row dicts
+            fields = list(queryset.query.values_select)
+            fields += [name for name in dict.fromkeys(field.lstrip('-') for field in ordering) if name not in fields]
+            queryset = queryset._chain()
+            # An earlier .values() hides annotations such as the search rank; select them again
+            queryset.query.append_annotation_mask([name for name in fields if name in queryset.query.annotations])
+            queryset = queryset.values(*fields)
+
+        if self.compat_pagination_class.page_query_param in request.query_params:
+            self.compat = self.compat_pagination_class()
+            self.compat.page_size = self.page_size
+            self.compat.max_page_size = self.max_page_size
+            return self.compat.paginate_queryset(queryset.order_by(*ordering), request, view)
+
+        if self.wants_count(request):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.compat is not None:
+            return self.compat.get_paginated_response(data)
+        payload = [('count', self.count)] if self.count is not None else []
+        payload += [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]
+        return Response(OrderedDict(payload))
+
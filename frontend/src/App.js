@@ -23,6 +23,7 @@ import ProductDetail from './Shop/ProductDetail';
 
 import Checkout from './views/Checkout';
 import Purchases from './views/Purchases';
+import CheckoutResult from './views/CheckoutResult';
 import SupportPage from './views/SupportPage';
 import SupportRequestsPage from './views/SupportRequestsPage';
 import Footer from './components/Footer';
@@ -52,6 +53,8 @@ function App() {
                     <PrivateRoutes path="/notifications" component={Notifications} />
                     
                     <PrivateRoutes exact path="/checkout" component={Checkout} />
+                    <PrivateRoutes exact path="/checkout/success" component={CheckoutResult} />
+                    <PrivateRoutes exact path="/checkout/cancel" component={CheckoutResult} />
                     
                     <PrivateRoutes exact path="/purchases" component={Purchases} />
                     
@@ -4,6 +4,11 @@ import AuthContext from '../context/AuthContext';
 import { useCart } from '../context/CartContext';
 import useAxios from '../utils/useAxios';
 
+const WS_URL = 'ws://127.0.0.1:8000';
+// Резервный опрос счётчика, пока сокет недоступен
+const POLL_INTERVAL = 30000;
+const RECONNECT_DELAY = 5000;
+
 function NavbarComponent() {
     const [notifications, setNotifications] = useState([]);
     const [showCart, setShowCart] = useState(false);
@@ -13,13 +18,16 @@ function NavbarComponent() {
     const searchRef = useRef(null);
     const history = useHistory();
     const api = useAxios();
-    let { user, logoutUser } = useContext(AuthContext);
+    let { user, authTokens, logoutUser } = useContext(AuthContext);
     const cartContext = useCart();
     const [showChat, setShowChat] = useState(false);
     const [unreadMessages, setUnreadMessages] = useState(0);
     const [messages, setMessages] = useState([]);
+    const [hasOlderMessages, setHasOlderMessages] = useState(false);
     const [newMessage, setNewMessage] = useState('');
     const messagesEndRef = useRef(null);
+    const showChatRef = useRef(showChat);
+    const socketRef = useRef(null);
 
     const { cartItems, removeFromCart } = cartContext || {};
 
@@ -102,12 +110,26 @@ function NavbarComponent() {
     const fetchChatHistory = async () => {
         try {
             const response = await api.get('/api/chat/admin_chat/');
-            setMessages(response.data);
+            setMessages(response.data.results);
+            // previous есть, если до первого сообщения окна были ещё сообщения
+            setHasOlderMessages(Boolean(response.data.previous));
         } catch (error) {
             console.error('Error fetching chat history:', error);
         }
     };
 
+    // Подгрузка предыдущих сообщений перед первым показанным (?before=<id>)
+    const loadOlderMessages = async () => {
+        if (!messages.length) return;
+        try {
+            const response = await api.get('/api/chat/admin_chat/', { params: { before: messages[0].id } });
+            setMessages(prev => [...response.data.results, ...prev]);
+            setHasOlderMessages(Boolean(response.data.previous));
+        } catch (error) {
+            console.error('Error loading older messages:', error);
+        }
+    };
+
     // Функция для отправки сообщения
     const sendMessage = async (e) => {
         e.preventDefault();
@@ -118,7 +140,7 @@ function NavbarComponent() {
                 message: newMessage,
                 receiver: 1 // ID админа
             });
-            setMessages([...messages, response.data]);
+            addMessage(response.data);
             setNewMessage('');
             scrollToBottom();
         } catch (error) {
@@ -131,12 +153,81 @@ function NavbarComponent() {
         messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
     };
 
+    // Сообщение приходит и в ответе POST, и по сокету: добавляем один раз
+    const addMessage = (message) => {
+        setMessages(prev => prev.some(m => m.id === message.id) ? prev : [...prev, message]);
+    };
+
     useEffect(() => {
-        if (user) {
-            fetchUnreadCount();
-            const interval = setInterval(fetchUnreadCount, 30000); // Проверка каждые 30 секунд
-            return () => clearInterval(interval);
-        }
+        showChatRef.current = showChat;
+    }, [showChat]);
+
+    // Счётчик непрочитанных обновляется по сокету ws/chat/; опрос раз в 30 секунд
+    // включается только пока сокет не подключён
+    useEffect(() => {
+        if (!user || !authTokens) return;
+
+        let closed = false;
+        let pollInterval = null;
+        let reconnectTimer = null;
+
+        const startPolling = () => {
+            if (!pollInterval) {
+                pollInterval = setInterval(fetchUnreadCount, POLL_INTERVAL);
+            }
+        };
+
+        const stopPolling = () => {
+            clearInterval(pollInterval);
+            pollInterval = null;
+        };
+
+        const connect = () => {
+            // Токен берём из localStorage: useAxios обновляет его там
+            const tokens = JSON.parse(localStorage.getItem('authTokens')) || authTokens;
+            const socket = new WebSocket(`${WS_URL}/ws/chat/?token=${tokens.access}`);
+            socketRef.current = socket;
+
+            socket.onopen = () => {
+                stopPolling();
+                // Сообщения, пришедшие пока сокет был закрыт
+                fetchUnreadCount();
+            };
+
+            socket.onmessage = (event) => {
+                const data = JSON.parse(event.data);
+                // Значок берёт число со счётчика на сервере, сам ничего не считает
+                if (data.type === 'unread') {
+                    if (!showChatRef.current) setUnreadMessages(data.unread_count);
+                    return;
+                }
+                if (data.type !== 'message' || data.message.receiver !== user.user_id) return;
+                if (showChatRef.current) {
+                    addMessage(data.message);
+                    socket.send(JSON.stringify({ type: 'read', sender: data.message.sender }));
+                    scrollToBottom();
+                }
+            };
+
+            socket.onclose = () => {
+                socketRef.current = null;
+                if (closed) return;
+                startPolling();
+                reconnectTimer = setTimeout(connect, RECONNECT_DELAY);
+            };
+        };
+
+        fetchUnreadCount();
+        connect();
+
+        return () => {
+            closed = true;
+            stopPolling();
+            clearTimeout(reconnectTimer);
+            if (socketRef.current) {
+                socketRef.current.close();
+            }
+        };
     }, [user]);
 
     useEffect(() => {
@@ -183,9 +274,18 @@ function NavbarComponent() {
                 flexDirection: 'column',
                 gap: '10px'
             }}>
-                {messages.map((msg, index) => (
+{hasOlderMessages && (
+                    <button
+                        type="button"
+                        className="btn btn-sm btn-outline-light align-self-center"
+                        onClick={loadOlderMessages}
+                    >
+                        Load older messages
+                    </button>
+                )}
+                {messages.map((msg) => (
                     <div
-                        key={index}
+                        key={msg.id}
                         className={`message ${msg.sender === user.user_id ? 'sent' : 'received'}`}
                         style={{
                             alignSelf: msg.sender === user.user_id ? 'flex-end' : 'flex-start',
@@ -1,11 +1,22 @@
-import React, { useState, useEffect, useContext } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useHistory } from 'react-router-dom';
 import { useCart } from '../context/CartContext';
 import useAxios from '../utils/useAxios';
-import AuthContext from '../context/AuthContext';
+
+// Те же формулы, что в OrderSerializer.create: сумма платежа PayPal должна совпасть с итогом заказа
+const TAX_RATE = 0.10;
+const SERVICE_FEE_RATE = 0.05;
+const roundCents = (value) => Math.round((value + Number.EPSILON) * 100) / 100;
+
+const orderTotals = (items) => {
+  const subtotal = items.reduce((sum, item) => sum + parseFloat(item.price) * item.quantity, 0);
+  const shipping = items.reduce((sum, item) => sum + parseFloat(item.shipping || 0) * item.quantity, 0);
+  const tax = roundCents(subtotal * TAX_RATE);
+  const serviceFee = roundCents(subtotal * SERVICE_FEE_RATE);
+  return { subtotal, shipping, tax, serviceFee, total: roundCents(subtotal + shipping + tax + serviceFee) };
+};
 
 const Checkout = () => {
-  const { user } = useContext(AuthContext);
   const [activeStep, setActiveStep] = useState(0);
   const [shippingInfo, setShippingInfo] = useState({
     fullName: '',
@@ -21,8 +32,10 @@ const Checkout = () => {
   const [error, setError] = useState('');
   const [serverStatus, setServerStatus] = useState(true); // Track server status
   const [sdkReady, setSdkReady] = useState(false); // Добавляем состояние для PayPal SDK
+  // Один ключ на попытку оформления: повторный клик или ретрай не создаст второй заказ
+  const idempotencyKey = useRef(null);
   
-  const { cartItems, calculateTotal, clearCart } = useCart();
+  const { cartItems, clearCart } = useCart();
   const api = useAxios();
   const history = useHistory();
   
@@ -137,12 +150,8 @@ const Checkout = () => {
     }
     
     try {
-      // Calculate totals directly
-      const subtotal = cartItems.reduce((total, item) => total + (item.price * item.quantity), 0);
-      const shipping = subtotal > 50 ? 0 : 5.99;
-      const tax = parseFloat((subtotal * 0.085).toFixed(2));
-      const serviceFee = parseFloat((subtotal * 0.05).toFixed(2));
-      const total = parseFloat((subtotal + shipping + tax + serviceFee).toFixed(2));
+      // Итоги заказа бэкенд считает сам; здесь они нужны для суммы платежа PayPal
+      const { subtotal, shipping, tax, serviceFee, total } = orderTotals(cartItems);
       
       const orderData = {
         full_name: shippingInfo.fullName,
@@ -159,8 +168,7 @@ const Checkout = () => {
         total_price: total,
         order_items: cartItems.map(item => ({
           product: item.id,
-          quantity: item.quantity,
-          price: parseFloat(item.price)
+          qty: item.quantity
         }))
         };
      
@@ -191,57 +199,35 @@ const Checkout = () => {
                 }]
               });
             },
-            // In your onApprove function in handlePlaceOrder
-            onApprove: async function(data, actions) {
+            // Платёж захватывает бэкенд по вебхуку CHECKOUT.ORDER.APPROVED;
+            // заказ станет Paid, когда придёт PAYMENT.CAPTURE.COMPLETED
+            onApprove: async function(data) {
               try {
-                const details = await actions.order.capture();
-                console.log('Payment completed', details);
-                
-                // Map PayPal status to match what the backend expects
-                // The backend expects "Paid" not "paid"
-                const paymentStatus = "Paid";
-                
-                // Simplify the order data structure to match Django model expectations
-                // Calculate order totals
-                const subtotal = cartItems.reduce((sum, item) => sum + (parseFloat(item.price) * item.quantity), 0);
-                const shippingCost = cartItems.reduce((sum, item) => sum + (parseFloat(item.shipping || 0) * item.quantity), 0);
-                const taxRate = 0.10; // 10% tax
-                const serviceFeeRate = 0.05; // 5% service fee
-                const tax = subtotal * taxRate;
-                const serviceFee = subtotal * serviceFeeRate;
-                const total = subtotal + shippingCost + tax + serviceFee;
-
+                // Цены и итоги бэкенд берёт из товаров, клиент передаёт только позиции
                 const orderData = {
-                  customer: user.id,
                   payment_method: 'PayPal',
-                  payment_id: details.id,
-                  payment_status: paymentStatus,
-                  order_status: 'Pending',
-                  sub_total: subtotal.toFixed(2),
-                  shipping: shippingCost.toFixed(2),
-                  tax: tax.toFixed(2),
-                  service_fee: serviceFee.toFixed(2),
-                  total: total.toFixed(2),
+                  payment_id: data.orderID,
                   order_items: cartItems.map(item => ({
                     product: item.id,
-                    qty: item.quantity,
-                    price: parseFloat(item.price),
-                    sub_total: (parseFloat(item.price) * item.quantity).toFixed(2),
-                    shipping: parseFloat(item.shipping || 0).toFixed(2)
+                    qty: item.quantity
                   }))
                 };
                 
-                console.log('Sending simplified order data:', orderData);
+                console.log('Sending order data:', orderData);
                 
                 // Create order in backend
-                const response = await api.post('/orders/', orderData);
+                // Ключ привязан к платежу PayPal: заказ на один платёж создаётся один раз
+                const response = await api.post('/orders/', orderData, {
+                  headers: { 'Idempotency-Key': `paypal-${data.orderID}` }
+                });
                 
                 if (response.status === 201) {
                   clearCart();
-                  setActiveStep(2);
+                  // Страница результата опрашивает статус заказа, пока вебхук его не оплатит
+                  history.push(`/checkout/success?order_id=${response.data.order_id}&payment_status=processing`);
                 }
               } catch (error) {
-                console.error('Payment capture error:', error);
+                console.error('Order creation error:', error);
                 if (error.response && error.response.data) {
                   console.error('Error response data:', error.response.data);
                   
@@ -283,9 +269,15 @@ const Checkout = () => {
       }
       
       // Для других методов оплаты отправляем запрос на создание заказа
-      const response = await api.post('/orders/', orderData);
+      if (!idempotencyKey.current) {
+        idempotencyKey.current = `checkout-${Date.now()}-${Math.random().toString(36).slice(2)}`;
+      }
+      const response = await api.post('/orders/', orderData, {
+        headers: { 'Idempotency-Key': idempotencyKey.current }
+      });
       
       if (response.status === 201) {
+        idempotencyKey.current = null;
         // Check if there's a payment URL to redirect to (for external payment gateways)
         if (response.data && response.data.payment_url) {
           window.location.href = response.data.payment_url;
@@ -327,6 +319,8 @@ const Checkout = () => {
     }
   };
   
+  const totals = orderTotals(cartItems);
+
   // Обновляем стили для основного контейнера
   return (
     <div className="gaming-form" style={{ 
@@ -565,29 +559,24 @@ const Checkout = () => {
                     <h4 className="mb-3">Order Summary</h4>
                     <div className="summary-item d-flex justify-content-between mb-2">
                       <span>Subtotal:</span>
-                      <span>${calculateTotal().toFixed(2)}</span>
+                      <span>${totals.subtotal.toFixed(2)}</span>
                     </div>
                     <div className="summary-item d-flex justify-content-between mb-2">
                       <span>Shipping:</span>
-                      <span>${calculateTotal() > 50 ? '0.00' : '5.99'}</span>
+                      <span>${totals.shipping.toFixed(2)}</span>
                     </div>
                     <div className="summary-item d-flex justify-content-between mb-2">
-                      <span>Tax (8.5%):</span>
-                      <span>${(calculateTotal() * 0.085).toFixed(2)}</span>
+                      <span>Tax (10%):</span>
+                      <span>${totals.tax.toFixed(2)}</span>
                     </div>
                     <div className="summary-item d-flex justify-content-between mb-2">
                       <span>Service Fee (5%):</span>
-                      <span>${(calculateTotal() * 0.05).toFixed(2)}</span>
+                      <span>${totals.serviceFee.toFixed(2)}</span>
                     </div>
                     <hr style={{ borderColor: 'rgba(255, 255, 255, 0.2)' }} />
                     <div className="summary-total d-flex justify-content-between fw-bold">
                       <span>Total:</span>
-                      <span>${(
-                        calculateTotal() + 
-                        (calculateTotal() > 50 ? 0 : 5.99) + 
-                        calculateTotal() * 0.085 + 
-                        calculateTotal() * 0.05
-                      ).toFixed(2)}</span>
+                      <span>${totals.total.toFixed(2)}</span>
                     </div>
                   </div>
 
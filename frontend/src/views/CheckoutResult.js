@@ -0,0 +1,103 @@
+import React, { useState, useEffect } from 'react';
+import { Link, useLocation } from 'react-router-dom';
+import useAxios from '../utils/useAxios';
+import { FaCheckCircle, FaTimesCircle, FaSpinner } from 'react-icons/fa';
+import '../styles/support-page.css';
+
+// Как часто и как долго опрашиваем заказ, пока вебхук PayPal не обработан
+const POLL_INTERVAL = 3000;
+const POLL_TIMEOUT = 120000;
+
+const CheckoutResult = () => {
+  const location = useLocation();
+  const params = new URLSearchParams(location.search);
+  const orderId = params.get('order_id');
+  const [paymentStatus, setPaymentStatus] = useState(() => {
+    // paypal_success передаёт payment_status=processing, если оплата ещё не подтверждена
+    if (params.get('error')) return 'Failed';
+    return params.get('payment_status') === 'processing' ? 'Processing' : 'Paid';
+  });
+  const [timedOut, setTimedOut] = useState(false);
+  const api = useAxios();
+
+  useEffect(() => {
+    if (!orderId || paymentStatus !== 'Processing') return;
+
+    let isMounted = true;
+    const startedAt = Date.now();
+    let timer;
+
+    const poll = async () => {
+      try {
+        const response = await api.get(`/orders/${orderId}/status/`);
+        if (!isMounted) return;
+        if (response.data.payment_status !== 'Processing') {
+          setPaymentStatus(response.data.payment_status);
+          return;
+        }
+      } catch (error) {
+        console.error('Ошибка при получении статуса заказа:', error);
+      }
+      if (!isMounted) return;
+      if (Date.now() - startedAt >= POLL_TIMEOUT) {
+        setTimedOut(true);
+        return;
+      }
+      timer = setTimeout(poll, POLL_INTERVAL);
+    };
+
+    timer = setTimeout(poll, 0);
+    return () => {
+      isMounted = false;
+      clearTimeout(timer);
+    };
+  }, [orderId, paymentStatus]);
+
+  const renderStatus = () => {
+    switch (paymentStatus) {
+      case 'Paid':
+        return (
+          <>
+            <h1 className="gaming-form__title"><FaCheckCircle /> Payment received</h1>
+            <p>Your game keys are on their way to your email and are listed in your purchases.</p>
+          </>
+        );
+      case 'Failed':
+        return (
+          <>
+            <h1 className="gaming-form__title"><FaTimesCircle /> Payment failed</h1>
+            <p>PayPal did not complete the payment. You have not been charged.</p>
+          </>
+        );
+      default:
+        return (
+          <>
+            <h1 className="gaming-form__title"><FaSpinner /> Payment processing</h1>
+            <p>
+              {timedOut
+                ? 'PayPal has not confirmed the payment yet. Check your purchases in a few minutes.'
+                : 'Waiting for PayPal to confirm the payment...'}
+            </p>
+          </>
+        );
+    }
+  };
+
+  return (
+    <div className="gaming-form d-flex align-center justify-center" style={{
+      backgroundImage: 'url("/images/Background 12.png")',
+      backgroundSize: 'cover',
+      backgroundPosition: 'center',
+      minHeight: '100vh',
+      padding: '40px 0'
+    }}>
+      <div className="gaming-form__container" style={{ maxWidth: '800px', width: '90%', padding: '2.5rem' }}>
+        {renderStatus()}
+        {orderId && <p>Order #{orderId}</p>}
+        <Link to="/purchases" className="btn btn-primary">Go to purchases</Link>
+      </div>
+    </div>
+  );
+};
+
+export default CheckoutResult;
@@ -8,6 +8,8 @@ function SupportRequestsPage() {
     const { user } = useContext(AuthContext);
     const [requests, setRequests] = useState([]);
     const [users, setUsers] = useState([]);
+    const [requestsNext, setRequestsNext] = useState(null);
+    const [usersNext, setUsersNext] = useState(null);
     const [selectedRequest, setSelectedRequest] = useState(null);
     const [selectedUser, setSelectedUser] = useState(null);
     const [reply, setReply] = useState('');
@@ -18,6 +20,7 @@ function SupportRequestsPage() {
     const [directMessage, setDirectMessage] = useState('');
     const [showChat, setShowChat] = useState(false);
     const [chatMessages, setChatMessages] = useState([]);
+    const [hasOlderMessages, setHasOlderMessages] = useState(false);
     const [newChatMessage, setNewChatMessage] = useState('');
     const [selectedUserId, setSelectedUserId] = useState(null);
     const messagesEndRef = useRef(null);
@@ -39,8 +42,11 @@ function SupportRequestsPage() {
                 console.log('Support Requests:', requestsResponse.data);
                 console.log('Users:', usersResponse.data);
                 
-                setRequests(requestsResponse.data);
-                setUsers(usersResponse.data);
+                // Списки приходят страницами: { next, previous, results }
+                setRequests(requestsResponse.data.results);
+                setRequestsNext(requestsResponse.data.next);
+                setUsers(usersResponse.data.results);
+                setUsersNext(usersResponse.data.next);
             } catch (err) {
                 console.error('Error fetching data:', err);
                 setError('Failed to load data. Please try again.');
@@ -52,6 +58,31 @@ function SupportRequestsPage() {
         fetchData();
     }, []);
 
+    // Подгрузка следующей страницы тикетов / пользователей по ссылке next
+    const loadMoreRequests = async () => {
+        if (!requestsNext) return;
+        try {
+            const response = await api.get(requestsNext);
+            setRequests(prev => [...prev, ...response.data.results]);
+            setRequestsNext(response.data.next);
+        } catch (err) {
+            console.error('Error loading more requests:', err);
+            showToast('Failed to load more requests.', 'error');
+        }
+    };
+
+    const loadMoreUsers = async () => {
+        if (!usersNext) return;
+        try {
+            const response = await api.get(usersNext);
+            setUsers(prev => [...prev, ...response.data.results]);
+            setUsersNext(response.data.next);
+        } catch (err) {
+            console.error('Error loading more users:', err);
+            showToast('Failed to load more users.', 'error');
+        }
+    };
+
     // Функция для прокрутки чата вниз
     const scrollToBottom = () => {
         messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -62,12 +93,28 @@ function SupportRequestsPage() {
         try {
             const response = await api.get(`/api/chat/messages/${userId}/`);
             if (response.data) {
-                setChatMessages(response.data);
+                // Последние сообщения; более ранние — кнопкой «Load older messages»
+                setChatMessages(response.data.results);
+                setHasOlderMessages(Boolean(response.data.previous));
                 scrollToBottom();
             }
         } catch (error) {
             console.error('Error fetching chat messages:', error);
             setChatMessages([]);
+            setHasOlderMessages(false);
+        }
+    };
+
+    // Подгрузка предыдущих сообщений перед первым показанным (?before=<id>)
+    const loadOlderMessages = async () => {
+        if (!selectedUserId || !chatMessages.length) return;
+        try {
+            const response = await api.get(`/api/chat/messages/${selectedUserId}/`, { params: { before: chatMessages[0].id } });
+            setChatMessages(prev => [...response.data.results, ...prev]);
+            setHasOlderMessages(Boolean(response.data.previous));
+        } catch (error) {
+            console.error('Error loading older messages:', error);
+            showToast('Failed to load older messages.', 'error');
         }
     };
 
@@ -140,11 +187,9 @@ function SupportRequestsPage() {
             }
 
             if (response.status === 200 || response.status === 201) {
-                const updatedResponse = await api.get('/support/tickets/');
-                setRequests(updatedResponse.data);
-                const updatedRequest = updatedResponse.data.find(
-                    req => req.id === selectedRequest.id
-                );
+                // Ответ уже содержит обновлённый тикет — весь список заново не грузим
+                const updatedRequest = response.data;
+                setRequests(prev => prev.map(req => req.id === updatedRequest.id ? updatedRequest : req));
                 setSelectedRequest(updatedRequest);
                 setReply('');
                 showToast('Reply sent successfully!', 'success');
@@ -349,9 +394,18 @@ function SupportRequestsPage() {
                 flexDirection: 'column',
                 gap: '10px'
             }}>
-                {chatMessages.map((msg, index) => (
+{hasOlderMessages && (
+                    <button
+                        type="button"
+                        className="btn btn-sm btn-outline-light align-self-center"
+                        onClick={loadOlderMessages}
+                    >
+                        Load older messages
+                    </button>
+                )}
+                {chatMessages.map((msg) => (
                     <div
-                        key={index}
+                        key={msg.id}
                         className={`message ${msg.sender === user.id ? 'sent' : 'received'}`}
                         style={{
                             alignSelf: msg.sender === user.id ? 'flex-end' : 'flex-start',
@@ -486,6 +540,14 @@ function SupportRequestsPage() {
                                             </div>
                                         </div>
                                     ))}
+                                    {requestsNext && (
+                                        <button
+                                            className="list-group-item list-group-item-action bg-dark text-light border-secondary text-center"
+                                            onClick={loadMoreRequests}
+                                        >
+                                            Load more
+                                        </button>
+                                    )}
                                 </div>
                             </div>
                         </div>
@@ -522,6 +584,14 @@ function SupportRequestsPage() {
                                             </div>
                                         </button>
                                     ))}
+                                    {usersNext && (
+                                        <button
+                                            className="list-group-item list-group-item-action bg-dark text-light border-secondary text-center"
+                                            onClick={loadMoreUsers}
+                                        >
+                                            Load more
+                                        </button>
+                                    )}
                                 </div>
                             </div>
                         </div>